@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+
+from app.services.profiling import PROFILE_HEADER, profile_store, valid_profile_token
+
+router = APIRouter()
+
+
+async def require_profile_token(request: Request):
+    """Profiles expose code paths and timings; only serve them to PROFILE_TOKEN holders"""
+    if not valid_profile_token(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """List the slowest and most recent request and job profiles"""
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    """Get a profile summary with its pstats report"""
+    entry = profile_store.get(profile_id)
+    
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return {key: value for key, value in entry.items() if key != "data"}
+
+
+@router.get("/profiles/{profile_id}/download", dependencies=[Depends(require_profile_token)])
+async def download_profile(profile_id: str):
+    """Download a profile as a pstats file (open with pstats or snakeviz)"""
+    entry = profile_store.get(profile_id)
+    
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return Response(
+        content=entry["data"],
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
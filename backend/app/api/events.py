@@ -6,6 +6,10 @@ from bson import ObjectId
 
 from app.models.event import Event, EventFilter
 from app.services.event_service import generate_mock_events
+from app.services.cascade_service import enqueue_cascade_delete
+from app.services.embedding_index import index_events, unindex_event
+from app.services.repository import to_api, insert_document, set_fields
+from app.services.mongodb import get_db
 
 router = APIRouter()
 
@@ -17,7 +21,7 @@ async def get_events(
     max_price: Optional[float] = None,
     skip: int = 0,
     limit: int = 100,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get events with optional filters"""
     # Build the query
@@ -41,7 +45,7 @@ async def get_events(
     
     # Execute the query
     events = []
-    cursor = app.mongodb["events"].find(query).sort("startDate", 1).skip(skip).limit(limit)
+    cursor = db["events"].find(query).sort("startDate", 1).skip(skip).limit(limit)
     
     async for document in cursor:
         document["id"] = str(document.pop("_id"))
@@ -49,10 +53,10 @@ async def get_events(
     
     # If no events found, generate mock events for development
     if not events:
-        event_count = await app.mongodb["events"].count_documents({})
+        event_count = await db["events"].count_documents({})
         if event_count == 0:
-            await generate_mock_events(app.mongodb)
-            return await get_events(type, location, min_price, max_price, skip, limit, app)
+            await generate_mock_events(db)
+            return await get_events(type, location, min_price, max_price, skip, limit, db)
     
     return events
 
@@ -60,13 +64,13 @@ async def get_events(
 @router.get("/{event_id}", response_model=Event)
 async def get_event(
     event_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get a specific event by ID"""
     if not ObjectId.is_valid(event_id):
         raise HTTPException(status_code=400, detail="Invalid event ID format")
     
-    event = await app.mongodb["events"].find_one({"_id": ObjectId(event_id)})
+    event = await db["events"].find_one({"_id": ObjectId(event_id)})
     
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -78,7 +82,7 @@ async def get_event(
 @router.post("/", response_model=Event)
 async def create_event(
     event: Event = Body(...),
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create a new event"""
     # Convert event model to dict for MongoDB
@@ -91,66 +95,59 @@ async def create_event(
     else:
         del event_dict["id"]
     
-    # Insert event
-    result = await app.mongodb["events"].insert_one(event_dict)
+    # Insert event and return it without reading it back
+    created_event = await insert_document(db, "events", event_dict)
+    await index_events([created_event])
     
-    # Return the created event
-    created_event = await app.mongodb["events"].find_one({"_id": result.inserted_id})
-    created_event["id"] = str(created_event.pop("_id"))
-    
-    return Event(**created_event)
+    return Event(**to_api(created_event))
 
 
 @router.put("/{event_id}", response_model=Event)
 async def update_event(
     event_id: str,
     event: Event = Body(...),
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update an event"""
     if not ObjectId.is_valid(event_id):
         raise HTTPException(status_code=400, detail="Invalid event ID format")
     
-    # Check if event exists
-    existing_event = await app.mongodb["events"].find_one({"_id": ObjectId(event_id)})
-    if existing_event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
     # Convert event model to dict for MongoDB
     event_dict = event.dict(exclude={"id"})
     
-    # Update the event
-    result = await app.mongodb["events"].update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": event_dict}
-    )
+    # Update and return the event in a single round trip
+    updated_event = await set_fields(db, "events", {"_id": ObjectId(event_id)}, event_dict)
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=304, detail="Event not modified")
+    if updated_event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
     
-    # Return the updated event
-    updated_event = await app.mongodb["events"].find_one({"_id": ObjectId(event_id)})
-    updated_event["id"] = str(updated_event.pop("_id"))
+    await index_events([updated_event])
     
-    return Event(**updated_event)
+    return Event(**to_api(updated_event))
 
 
 @router.delete("/{event_id}", response_model=dict)
 async def delete_event(
     event_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete an event"""
     if not ObjectId.is_valid(event_id):
         raise HTTPException(status_code=400, detail="Invalid event ID format")
     
+    if await db["events"].find_one({"_id": ObjectId(event_id)}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # Queue deletion of associated notifications before deleting the event, so a
+    # failure in between can't leave orphans; the job is harmless if the delete then fails
+    job_id = await enqueue_cascade_delete(db, "notifications", {"eventId": event_id})
+    
     # Delete the event
-    result = await app.mongodb["events"].delete_one({"_id": ObjectId(event_id)})
+    result = await db["events"].delete_one({"_id": ObjectId(event_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # Also delete associated notifications
-    await app.mongodb["notifications"].delete_many({"eventId": event_id})
+    await unindex_event(event_id)
     
-    return {"message": "Event deleted successfully"}
\ No newline at end of file
+    return {"message": "Event deleted successfully", "cascadeJobId": job_id}
\ No newline at end of file
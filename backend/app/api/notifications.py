@@ -5,6 +5,10 @@ from datetime import datetime
 from bson import ObjectId
 
 from app.models.notification import Notification, NotificationCreate
+from app.models.event import Event
+from app.services.notification_queue import enqueue_notification, update_notification_stats
+from app.services.repository import user_query, to_api, delete_document
+from app.services.mongodb import get_db
 
 router = APIRouter()
 
@@ -16,7 +20,7 @@ async def get_notifications(
     type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get notifications with optional filters"""
     # Build the query
@@ -40,7 +44,7 @@ async def get_notifications(
     
     # Execute the query
     notifications = []
-    cursor = app.mongodb["notifications"].find(query).sort("sentAt", -1).skip(skip).limit(limit)
+    cursor = db["notifications"].find(query).sort("sentAt", -1).skip(skip).limit(limit)
     
     async for document in cursor:
         document["id"] = str(document.pop("_id"))
@@ -52,13 +56,13 @@ async def get_notifications(
 @router.get("/{notification_id}", response_model=Notification)
 async def get_notification(
     notification_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get a specific notification by ID"""
     if not ObjectId.is_valid(notification_id):
         raise HTTPException(status_code=400, detail="Invalid notification ID format")
     
-    notification = await app.mongodb["notifications"].find_one({"_id": ObjectId(notification_id)})
+    notification = await db["notifications"].find_one({"_id": ObjectId(notification_id)})
     
     if notification is None:
         raise HTTPException(status_code=404, detail="Notification not found")
@@ -70,76 +74,57 @@ async def get_notification(
 @router.post("/manual", response_model=Notification)
 async def create_manual_notification(
     notification: NotificationCreate = Body(...),
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create a manual notification to be sent to a user"""
-    # Check if user exists
-    if ObjectId.is_valid(notification.userId):
-        user = await app.mongodb["users"].find_one({"_id": ObjectId(notification.userId)})
-    else:
-        # Try with telegramId
-        try:
-            user = await app.mongodb["users"].find_one({"telegramId": int(notification.userId)})
-            if user:
-                notification.userId = str(user["_id"])
-        except ValueError:
-            user = None
+    # Check if user exists (by ObjectId or telegramId)
+    try:
+        user = await db["users"].find_one(user_query(notification.userId), {"_id": 1, "telegramId": 1})
+    except ValueError:
+        user = None
     
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    notification.userId = str(user["_id"])
     
     # Check if event exists
     if ObjectId.is_valid(notification.eventId):
-        event = await app.mongodb["events"].find_one({"_id": ObjectId(notification.eventId)})
+        event = await db["events"].find_one({"_id": ObjectId(notification.eventId)})
     else:
         event = None
     
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # Create notification object
-    new_notification = Notification(
-        userId=notification.userId,
-        eventId=notification.eventId,
-        sentAt=datetime.utcnow(),
-        status="pending",
+    # Queue the notification; delivery workers send it through Telegram
+    created_notification = await enqueue_notification(
+        db,
+        notification.userId,
+        user["telegramId"],
+        Event(**to_api(event)),
         type="manual"
     )
     
-    # Convert to dict for MongoDB
-    notification_dict = new_notification.dict()
-    notification_dict.pop("id")  # Remove id field
-    
-    # Insert notification
-    result = await app.mongodb["notifications"].insert_one(notification_dict)
-    
-    # Simulate sending notification (in a real app, this would call the Telegram API)
-    # Here we'll just mark it as sent after a brief delay
-    await app.mongodb["notifications"].update_one(
-        {"_id": result.inserted_id},
-        {"$set": {"status": "sent"}}
-    )
-    
-    # Return the created notification
-    created_notification = await app.mongodb["notifications"].find_one({"_id": result.inserted_id})
-    created_notification["id"] = str(created_notification.pop("_id"))
-    
-    return Notification(**created_notification)
+    return Notification(**to_api(created_notification))
 
 
 @router.delete("/{notification_id}", response_model=dict)
 async def delete_notification(
     notification_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete a notification"""
     if not ObjectId.is_valid(notification_id):
         raise HTTPException(status_code=400, detail="Invalid notification ID format")
     
     # Delete the notification
-    result = await app.mongodb["notifications"].delete_one({"_id": ObjectId(notification_id)})
+    deleted = await delete_document(db, "notifications", {"_id": ObjectId(notification_id)})
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    # A deleted pending notification will never be delivered
+    if deleted.get("status") == "pending":
+        await update_notification_stats(db, deleted["userId"], {"pending": -1})
+    
     return {"message": "Notification deleted successfully"}
\ No newline at end of file
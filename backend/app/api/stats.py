@@ -2,33 +2,37 @@ from fastapi import APIRouter, HTTPException, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
+from bson import ObjectId
+
+from app.services.cascade_service import CASCADE_COLLECTION
+from app.services.mongodb import get_db, pool_metrics
 
 router = APIRouter()
 
 @router.get("/")
 async def get_stats(
     days: int = 7,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get dashboard statistics"""
     # Get total users
-    total_users = await app.mongodb["users"].count_documents({})
+    total_users = await db["users"].count_documents({})
     
     # Get active users (active in the last 7 days)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    active_users = await app.mongodb["users"].count_documents({"lastActive": {"$gte": week_ago}})
+    active_users = await db["users"].count_documents({"lastActive": {"$gte": week_ago}})
     
     # Get total events
-    total_events = await app.mongodb["events"].count_documents({})
+    total_events = await db["events"].count_documents({})
     
     # Get total notifications
-    total_notifications = await app.mongodb["notifications"].count_documents({})
+    total_notifications = await db["notifications"].count_documents({})
     
     # Get daily user counts for the past N days
-    users_per_day = await _get_daily_counts(app.mongodb, "users", "createdAt", days)
+    users_per_day = await _get_daily_counts(db, "users", "createdAt", days)
     
     # Get daily notification counts for the past N days
-    notifications_per_day = await _get_daily_counts(app.mongodb, "notifications", "sentAt", days)
+    notifications_per_day = await _get_daily_counts(db, "notifications", "sentAt", days)
     
     return {
         "totalUsers": total_users,
@@ -40,6 +44,38 @@ async def get_stats(
     }
 
 
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """Get MongoDB connection pool utilization and checkout wait times"""
+    return pool_metrics.stats()
+
+
+@router.get("/cascade-deletes/{job_id}")
+async def get_cascade_delete(
+    job_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get the progress of a background cascade delete"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+    
+    job = await db[CASCADE_COLLECTION].find_one({"_id": ObjectId(job_id)})
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Cascade delete job not found")
+    
+    return {
+        "id": str(job["_id"]),
+        "collection": job["collection"],
+        "status": job["status"],
+        "deleted": job["deleted"],
+        "batches": job["batches"],
+        "createdAt": job["createdAt"],
+        "updatedAt": job["updatedAt"],
+        "finishedAt": job.get("finishedAt")
+    }
+
+
 async def _get_daily_counts(db, collection_name: str, date_field: str, days: int) -> List[Dict[str, Any]]:
     """Get daily counts for a collection based on a date field"""
     daily_counts = []
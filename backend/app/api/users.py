@@ -3,8 +3,12 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.models.user import User, UserPreferences, UserPreferencesUpdate
+from app.services.cascade_service import enqueue_cascade_delete
+from app.services.repository import user_query, to_api, insert_document, set_fields, delete_document
+from app.services.mongodb import get_db
 
 router = APIRouter()
 
@@ -12,11 +16,11 @@ router = APIRouter()
 async def get_users(
     skip: int = 0, 
     limit: int = 100,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get all users"""
     users = []
-    cursor = app.mongodb["users"].find().skip(skip).limit(limit)
+    cursor = db["users"].find().skip(skip).limit(limit)
     
     async for document in cursor:
         # Convert the ObjectId to string for the id field
@@ -29,123 +33,98 @@ async def get_users(
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get a specific user by ID"""
-    if not ObjectId.is_valid(user_id):
-        try:
-            # Try to find by telegramId if not a valid ObjectId
-            user = await app.mongodb["users"].find_one({"telegramId": int(user_id)})
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid user ID format")
-    else:
-        user = await app.mongodb["users"].find_one({"_id": ObjectId(user_id)})
+    try:
+        # Accepts either an ObjectId or a telegramId
+        query = user_query(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
+    
+    user = await db["users"].find_one(query)
         
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Convert the ObjectId to string for the id field
-    user["id"] = str(user.pop("_id"))
-    return User(**user)
+    return User(**to_api(user))
 
 
 @router.post("/", response_model=User)
 async def create_user(
     user: User = Body(...),
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create a new user"""
-    # Check if user with this telegramId already exists
-    existing_user = await app.mongodb["users"].find_one({"telegramId": user.telegramId})
-    if existing_user:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"User with telegramId {user.telegramId} already exists"
-        )
-    
     # Convert user model to dict for MongoDB
     user_dict = user.dict()
     user_dict.pop("id")  # Remove the id field, MongoDB will generate _id
     
-    # Insert user
-    result = await app.mongodb["users"].insert_one(user_dict)
-    
-    # Return the created user
-    created_user = await app.mongodb["users"].find_one({"_id": result.inserted_id})
-    created_user["id"] = str(created_user.pop("_id"))
+    # Insert user; the unique telegramId index rejects duplicates atomically
+    try:
+        created_user = await insert_document(db, "users", user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"User with telegramId {user.telegramId} already exists"
+        )
     
-    return User(**created_user)
+    return User(**to_api(created_user))
 
 
 @router.patch("/{user_id}/preferences", response_model=User)
 async def update_user_preferences(
     user_id: str,
     preferences: UserPreferencesUpdate = Body(...),
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update user preferences"""
-    # Find the user
-    if not ObjectId.is_valid(user_id):
-        try:
-            # Try to find by telegramId if not a valid ObjectId
-            user = await app.mongodb["users"].find_one({"telegramId": int(user_id)})
-            if user:
-                user_id = str(user["_id"])
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid user ID format")
-    else:
-        user = await app.mongodb["users"].find_one({"_id": ObjectId(user_id)})
-        
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        query = user_query(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
     
     # Update only the provided fields
     update_data = {
         f"preferences.{k}": v for k, v in preferences.dict(exclude_unset=True).items()
     }
+    update_data["lastActive"] = datetime.utcnow()
     
-    if update_data:
-        # Add lastActive update
-        update_data["lastActive"] = datetime.utcnow()
-        
-        # Update the user
-        result = await app.mongodb["users"].update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count == 0:
-            raise HTTPException(status_code=304, detail="User preferences not modified")
+    # Update and return the user in a single round trip
+    updated_user = await set_fields(db, "users", query, update_data)
     
-    # Return the updated user
-    updated_user = await app.mongodb["users"].find_one({"_id": ObjectId(user_id)})
-    updated_user["id"] = str(updated_user.pop("_id"))
+    if updated_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return User(**updated_user)
+    return User(**to_api(updated_user))
 
 
 @router.delete("/{user_id}", response_model=dict)
 async def delete_user(
     user_id: str,
-    app = Depends(lambda: None)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete a user"""
-    if not ObjectId.is_valid(user_id):
-        try:
-            # Try to find by telegramId if not a valid ObjectId
-            user = await app.mongodb["users"].find_one({"telegramId": int(user_id)})
-            if user:
-                user_id = str(user["_id"])
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid user ID format")
+    try:
+        query = user_query(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
     
-    # Delete the user
-    result = await app.mongodb["users"].delete_one({"_id": ObjectId(user_id)})
+    user = await db["users"].find_one(query, {"_id": 1})
     
-    if result.deleted_count == 0:
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Also delete associated notifications
-    await app.mongodb["notifications"].delete_many({"userId": user_id})
+    # Queue deletion of associated notifications before deleting the user, so a
+    # failure in between can't leave orphans; the job is harmless if the delete then fails
+    job_id = await enqueue_cascade_delete(
+        db, "notifications", {"userId": str(user["_id"])}
+    )
+    
+    # Delete the user
+    deleted_user = await delete_document(db, "users", {"_id": user["_id"]})
+    
+    if deleted_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return {"message": "User deleted successfully"}
\ No newline at end of file
+    return {"message": "User deleted successfully", "cascadeJobId": job_id}
\ No newline at end of file
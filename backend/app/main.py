@@ -1,20 +1,19 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional, List, Dict, Any
-import os
-from datetime import datetime, timedelta
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import asyncio
+from datetime import datetime
 
-from app.models.user import User, UserPreferences
-from app.models.event import Event
-from app.models.notification import Notification
-from app.services.mongodb import get_db, init_db
-from app.services.llm_service import extract_preferences
-from app.services.event_service import find_matching_events
+from app.services.mongodb import close_client, init_db
+from app.services.cascade_service import init_cascade_queue, run_cascade_worker
+from app.services.notification_queue import init_delivery_queue
+from app.services.metrics import MetricsMiddleware
+from app.services.profiling import ProfilingMiddleware
 from app.api.users import router as users_router
 from app.api.events import router as events_router
 from app.api.notifications import router as notifications_router
 from app.api.stats import router as stats_router
+from app.api.admin import router as admin_router
 
 # Create FastAPI app
 app = FastAPI(
@@ -32,19 +31,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight requests, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Profiles requests sent with an X-Profile header carrying PROFILE_TOKEN (or a PROFILE_SAMPLE_RATE sample)
+app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(events_router, prefix="/events", tags=["events"])
 app.include_router(notifications_router, prefix="/notifications", tags=["notifications"])
 app.include_router(stats_router, prefix="/stats", tags=["stats"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 @app.on_event("startup")
 async def startup_db_client():
     await init_db(app)
+    await init_cascade_queue(app.mongodb)
+    await init_delivery_queue(app.mongodb)
+    # Dependent documents of deleted users/events are removed in the background
+    app.cascade_worker = asyncio.create_task(run_cascade_worker(app.mongodb))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    app.mongodb_client.close()
+    app.cascade_worker.cancel()
+    close_client()
 
 @app.get("/")
 async def root():
@@ -58,6 +69,10 @@ async def health_check():
         "version": app.version
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Run with: uvicorn app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
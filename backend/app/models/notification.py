@@ -12,6 +12,8 @@ class Notification(BaseModel):
     sentAt: datetime = Field(default_factory=datetime.utcnow)
     status: str = "pending"  # "pending", "sent", "failed"
     type: str = "auto"  # "auto" or "manual"
+    attempts: int = 0  # delivery attempts made so far
+    lastError: Optional[str] = None  # last delivery error, if any
 
     @validator('status')
     def validate_status(cls, v):
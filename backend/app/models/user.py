@@ -20,6 +20,14 @@ class UserPreferences(BaseModel):
         return v
 
 
+class NotificationStats(BaseModel):
+    """Per-user notification counters, maintained with $inc on notification writes"""
+    total: int = 0  # notifications ever queued for the user
+    pending: int = 0  # notifications waiting to be delivered
+    failed: int = 0  # notifications that could not be delivered
+    lastSentAt: Optional[datetime] = None
+
+
 class User(BaseModel):
     """User model for MongoDB"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -30,6 +38,7 @@ class User(BaseModel):
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     preferences: UserPreferences = Field(default_factory=UserPreferences)
     lastActive: datetime = Field(default_factory=datetime.utcnow)
+    notificationStats: NotificationStats = Field(default_factory=NotificationStats)
 
     class Config:
         schema_extra = {
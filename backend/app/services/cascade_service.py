@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+from app.services.notification_queue import update_notification_stats
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cascade delete settings
+CASCADE_COLLECTION = "cascade_deletes"
+CASCADE_BATCH_SIZE = int(os.getenv("CASCADE_BATCH_SIZE", "1000"))
+CASCADE_BATCH_DELAY_SECONDS = float(os.getenv("CASCADE_BATCH_DELAY_SECONDS", "0.1"))
+CASCADE_LEASE_SECONDS = int(os.getenv("CASCADE_LEASE_SECONDS", "60"))
+CASCADE_POLL_SECONDS = float(os.getenv("CASCADE_POLL_SECONDS", "5"))
+
+
+async def init_cascade_queue(db) -> None:
+    """Create indexes used by the cascade delete queue"""
+    await db[CASCADE_COLLECTION].create_index([("status", 1), ("createdAt", 1)])
+
+
+async def enqueue_cascade_delete(db, collection_name: str, query: Dict[str, Any]) -> str:
+    """Queue the deletion of all documents in a collection matching a query
+
+    Returns the id of the cascade job so callers can track its progress.
+    """
+    now = datetime.utcnow()
+    job = {
+        "collection": collection_name,
+        "query": query,
+        "status": "pending",  # "pending", "running" or "done"
+        "deleted": 0,
+        "batches": 0,
+        "createdAt": now,
+        "updatedAt": now,
+        "leaseUntil": None,
+        "worker": None,
+    }
+    result = await db[CASCADE_COLLECTION].insert_one(job)
+    return str(result.inserted_id)
+
+
+async def claim_cascade_job(db, worker_id: str) -> Optional[Dict[str, Any]]:
+    """Claim the oldest unfinished job whose lease is free or has expired"""
+    now = datetime.utcnow()
+    return await db[CASCADE_COLLECTION].find_one_and_update(
+        {
+            "status": {"$in": ["pending", "running"]},
+            "$or": [{"leaseUntil": None}, {"leaseUntil": {"$lt": now}}],
+        },
+        {
+            "$set": {
+                "status": "running",
+                "worker": worker_id,
+                "leaseUntil": now + timedelta(seconds=CASCADE_LEASE_SECONDS),
+                "updatedAt": now,
+            }
+        },
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def process_cascade_job(db, job: Dict[str, Any], worker_id: str) -> int:
+    """Delete a job's documents in throttled batches until none are left
+
+    Every batch is idempotent, so a job picked up again after a crash simply
+    continues with whatever is still left to delete.
+    """
+    collection = db[job["collection"]]
+    total_deleted = 0
+
+    while True:
+        # Only fetch the ids (and what counter upkeep needs) so each batch stays small on the wire
+        cursor = collection.find(job["query"], {"_id": 1, "userId": 1, "status": 1}).limit(CASCADE_BATCH_SIZE)
+        documents = [doc async for doc in cursor]
+        ids = [doc["_id"] for doc in documents]
+        now = datetime.utcnow()
+
+        if not ids:
+            await db[CASCADE_COLLECTION].update_one(
+                {"_id": job["_id"], "worker": worker_id},
+                {"$set": {"status": "done", "finishedAt": now, "updatedAt": now, "leaseUntil": None}}
+            )
+            return total_deleted
+
+        if job["collection"] == "notifications":
+            deleted_count = await _delete_notifications(db, documents)
+        else:
+            deleted_count = (await collection.delete_many({"_id": {"$in": ids}})).deleted_count
+        total_deleted += deleted_count
+
+        # Record progress and renew the lease in the same write
+        progress = await db[CASCADE_COLLECTION].update_one(
+            {"_id": job["_id"], "worker": worker_id},
+            {
+                "$inc": {"deleted": deleted_count, "batches": 1},
+                "$set": {
+                    "updatedAt": now,
+                    "leaseUntil": now + timedelta(seconds=CASCADE_LEASE_SECONDS),
+                },
+            }
+        )
+        if progress.matched_count == 0:
+            # Another worker took over after our lease expired
+            logger.warning(f"Lost lease on cascade job {job['_id']}")
+            return total_deleted
+
+        # Throttle so large cascades don't starve other writes or replication
+        await asyncio.sleep(CASCADE_BATCH_DELAY_SECONDS)
+
+
+async def _delete_notifications(db, documents) -> int:
+    """Delete a batch of notifications, keeping the users' pending counters in step
+
+    Pending notifications are deleted per user with a status guard, so one
+    delivered in the meantime is neither counted nor left behind as pending.
+    """
+    pending: Dict[str, list] = {}
+    other = []
+    for doc in documents:
+        if doc.get("status") == "pending":
+            pending.setdefault(doc.get("userId"), []).append(doc["_id"])
+        else:
+            other.append(doc["_id"])
+
+    deleted = 0
+    for user_id, ids in pending.items():
+        result = await db["notifications"].delete_many({"_id": {"$in": ids}, "status": "pending"})
+        deleted += result.deleted_count
+        if result.deleted_count and user_id:
+            await update_notification_stats(db, user_id, {"pending": -result.deleted_count})
+        # Any that changed status since they were read are deleted with the rest
+        other.extend(ids)
+
+    if other:
+        deleted += (await db["notifications"].delete_many({"_id": {"$in": other}})).deleted_count
+    return deleted
+
+
+async def run_cascade_worker(db) -> None:
+    """Process queued cascade deletes until cancelled"""
+    worker_id = str(uuid.uuid4())
+    logger.info(f"Cascade delete worker {worker_id} started")
+
+    while True:
+        try:
+            job = await claim_cascade_job(db, worker_id)
+            if job is None:
+                await asyncio.sleep(CASCADE_POLL_SECONDS)
+                continue
+
+            deleted = await process_cascade_job(db, job, worker_id)
+            logger.info(
+                f"Cascade job {job['_id']} on {job['collection']} deleted {deleted} documents"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in cascade delete worker: {e}")
+            await asyncio.sleep(CASCADE_POLL_SECONDS)
@@ -0,0 +1,322 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Embedding settings
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "true").lower() == "true"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_INDEX_DIR = os.getenv(
+    "EMBEDDING_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "embeddings")
+)
+
+# Event ids are ObjectId hex strings (24 chars); leave room for uuid-style ids
+_ID_DTYPE = "S36"
+
+
+def event_text(event: Dict[str, Any]) -> str:
+    """Text embedded for an event: title, description and tags"""
+    tags = " ".join(event.get("tags") or [])
+    return f"{event.get('title', '')}. {event.get('description', '')} {tags}".strip()
+
+
+class EventEmbeddingIndex:
+    """Event embeddings stored as a contiguous float32 matrix, memory-mapped from disk
+
+    Rows are L2-normalized, so cosine similarity is a single matrix-vector
+    product. Updates overwrite a row in place, deletes leave a tombstone row
+    that is reused by the next insert, and the files grow by doubling, so
+    every write is O(1) amortized and never re-embeds the catalog.
+
+    Files in index_dir: vectors.npy (capacity x dim float32), ids.npy
+    (capacity event ids, empty for free rows), meta.json (row count, dim and
+    a generation bumped by every write) and .lock.
+
+    Several processes (API workers, the bot) share the files. Writers hold an
+    exclusive flock on .lock and reload the index first if another process
+    changed it, so no two processes allocate the same row; readers hold a
+    shared one. Each acquisition opens its own file description, so flock
+    also excludes threads of the same process from each other: searches on
+    different threads run concurrently, and only writers take an in-process
+    lock as well.
+    """
+
+    def __init__(self, index_dir: str = EMBEDDING_INDEX_DIR, model_name: str = EMBEDDING_MODEL):
+        self.index_dir = index_dir
+        self.model_name = model_name
+        self._model = None
+        self._write_lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # concurrent readers may both find the files changed
+        self._generation = None
+        self.vectors: Optional[np.ndarray] = None
+        self.ids: Optional[np.ndarray] = None
+        self.count = 0
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.index_dir, "meta.json")
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self.index_dir, ".lock")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.index_dir, "vectors.npy")
+
+    @property
+    def _ids_path(self) -> str:
+        return os.path.join(self.index_dir, "ids.npy")
+
+    def _get_model(self):
+        if self._model is None:
+            # Imported here so processes that never embed don't pay for torch
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as L2-normalized float32 vectors"""
+        vectors = self._get_model().encode(
+            list(texts),
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Hold the file lock shared with other processes (and threads)"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _write_locked(self):
+        """Hold the in-process write lock and the exclusive file lock"""
+        with self._write_lock, self._file_lock(exclusive=True):
+            yield
+
+    def load(self) -> bool:
+        """Memory-map the index files if they exist, reloading if they changed"""
+        if not os.path.exists(self._meta_path):
+            return False
+        with self._file_lock(exclusive=False), self._reload_lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        """load() for callers holding the exclusive lock, or the shared one and _reload_lock"""
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except OSError:
+            return False
+
+        generation = meta.get("generation", 0)
+        if generation == self._generation:
+            return True
+
+        self.vectors = np.load(self._vectors_path, mmap_mode="r+")
+        self.ids = np.load(self._ids_path, mmap_mode="r+")
+        self.count = meta["count"]
+        self.dim = meta["dim"]
+        self._rows = {}
+        self._free_rows = []
+        for row, event_id in enumerate(self.ids[:self.count]):
+            if event_id:
+                self._rows[event_id.decode()] = row
+            else:
+                self._free_rows.append(row)
+        self._generation = generation
+        return True
+
+    def _save_meta(self) -> None:
+        self.vectors.flush()
+        self.ids.flush()
+        generation = (self._generation or 0) + 1
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"count": self.count, "dim": self.dim, "model": self.model_name, "generation": generation}, f)
+        os.replace(tmp_path, self._meta_path)
+        self._generation = generation
+
+    def _allocate(self, capacity: int, dim: int) -> None:
+        """Create (or grow to) a given capacity, copying existing rows"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        vectors = np.lib.format.open_memmap(
+            self._vectors_path + ".tmp", mode="w+", dtype=np.float32, shape=(capacity, dim)
+        )
+        ids = np.lib.format.open_memmap(
+            self._ids_path + ".tmp", mode="w+", dtype=_ID_DTYPE, shape=(capacity,)
+        )
+        if self.vectors is not None and self.count:
+            vectors[:self.count] = self.vectors[:self.count]
+            ids[:self.count] = self.ids[:self.count]
+        vectors.flush()
+        ids.flush()
+        del vectors, ids
+
+        os.replace(self._vectors_path + ".tmp", self._vectors_path)
+        os.replace(self._ids_path + ".tmp", self._ids_path)
+        self.vectors = np.load(self._vectors_path, mmap_mode="r+")
+        self.ids = np.load(self._ids_path, mmap_mode="r+")
+        self.dim = dim
+
+    def add_vectors(self, event_ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Insert or overwrite precomputed (normalized) vectors for events"""
+        with self._write_locked():
+            self._load()
+            if self.vectors is None:
+                self._allocate(max(len(event_ids), 1024), vectors.shape[1])
+
+            for event_id, vector in zip(event_ids, vectors):
+                row = self._rows.get(event_id)
+                if row is None:
+                    if self._free_rows:
+                        row = self._free_rows.pop()
+                    else:
+                        if self.count == len(self.vectors):
+                            self._allocate(len(self.vectors) * 2, self.dim)
+                        row = self.count
+                        self.count += 1
+                    self.ids[row] = event_id.encode()
+                    self._rows[event_id] = row
+                self.vectors[row] = vector
+
+            self._save_meta()
+
+    def upsert_events(self, events: Sequence[Dict[str, Any]]) -> None:
+        """Embed events and store their vectors"""
+        if not events:
+            return
+        vectors = self.embed([event_text(event) for event in events])
+        self.add_vectors([str(event["_id"]) for event in events], vectors)
+
+    def remove(self, event_id: str) -> None:
+        """Drop an event; its row is reused by the next insert"""
+        with self._write_locked():
+            if not self._load():
+                return
+            row = self._rows.pop(event_id, None)
+            if row is None:
+                return
+            self.vectors[row] = 0.0
+            self.ids[row] = b""
+            self._free_rows.append(row)
+            self._save_meta()
+
+    def search_vector(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Top-k events by cosine similarity to a normalized query vector"""
+        if not os.path.exists(self._meta_path):
+            return []
+
+        # Rows are written in place, so hold the shared lock for the whole scan
+        with self._file_lock(exclusive=False):
+            with self._reload_lock:
+                if not self._load() or self.count == 0:
+                    return []
+                vectors, ids, count = self.vectors, self.ids, self.count
+
+            scores = vectors[:count] @ query
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for row in top:
+                event_id = ids[row]
+                # Tombstoned rows are zero vectors; skip them if they surface
+                if event_id:
+                    results.append((event_id.decode(), float(scores[row])))
+            return results
+
+    def search(self, text: str, k: int) -> Optional[List[Tuple[str, float]]]:
+        """Top-k events by cosine similarity to free text, or None if there is no index"""
+        if not self.load():
+            return None
+        return self.search_vector(self.embed([text])[0], k)
+
+
+# Shared by every caller in the process
+event_index = EventEmbeddingIndex()
+
+
+async def index_events(events: Sequence[Dict[str, Any]]) -> None:
+    """Embed and store events off the event loop; failures are logged, not raised"""
+    if not EMBEDDINGS_ENABLED:
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, event_index.upsert_events, list(events))
+    except Exception as e:
+        logger.error(f"Failed to index events: {e}")
+
+
+async def unindex_event(event_id: str) -> None:
+    """Remove an event from the index off the event loop; failures are logged, not raised"""
+    if not EMBEDDINGS_ENABLED:
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, event_index.remove, event_id)
+    except Exception as e:
+        logger.error(f"Failed to remove event {event_id} from index: {e}")
+
+
+async def semantic_search(text: str, k: int) -> Optional[List[Tuple[str, float]]]:
+    """Top-k (event id, score) for free text, or None if the index can't be used"""
+    if not EMBEDDINGS_ENABLED:
+        return None
+    try:
+        # Loading takes a file lock, so it happens off the event loop too
+        return await asyncio.get_running_loop().run_in_executor(None, event_index.search, text, k)
+    except Exception as e:
+        logger.error(f"Semantic search failed: {e}")
+        return None
+
+
+async def rebuild_index(db, batch_size: int = 512) -> int:
+    """Embed the whole event catalog into the index"""
+    batch = []
+    total = 0
+    async for event in db.events.find({}, {"title": 1, "description": 1, "tags": 1}):
+        batch.append(event)
+        if len(batch) >= batch_size:
+            await asyncio.get_running_loop().run_in_executor(None, event_index.upsert_events, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        await asyncio.get_running_loop().run_in_executor(None, event_index.upsert_events, batch)
+        total += len(batch)
+    return total
+
+
+if __name__ == "__main__":
+    # Build the index for an existing catalog: python -m app.services.embedding_index
+    from app.services.mongodb import get_database
+
+    async def _rebuild():
+        count = await rebuild_index(get_database("event-assistant-indexer"))
+        print(f"Indexed {count} events into {EMBEDDING_INDEX_DIR}")
+
+    asyncio.run(_rebuild())
@@ -0,0 +1,242 @@
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.models.user import UserPreferences
+
+# Load environment variables
+load_dotenv()
+
+# Ranking settings
+RANKING_TIME_DECAY_DAYS = float(os.getenv("RANKING_TIME_DECAY_DAYS", "14"))  # time score halves every this many days
+
+# How much each signal contributes to an event's score
+RANKING_WEIGHTS = {
+    "type": 3.0,
+    "keywords": 2.0,
+    "location": 1.0,
+    "price": 1.0,
+    "time": 1.0,
+    "similarity": 3.0,
+}
+
+# The fields filtering and scoring read; the event pool is fetched with only these
+CANDIDATE_FIELDS = {"type": 1, "tags": 1, "title": 1, "location": 1, "price": 1, "startDate": 1}
+
+# Joins the lowercased titles into one string searched per keyword; can't occur in a keyword
+_TITLE_SEPARATOR = "\0"
+
+# Keywords whose matching rows each EventColumns remembers; users share a small vocabulary
+_KEYWORD_CACHE_SIZE = 4096
+
+
+class EventColumns:
+    """Events as parallel NumPy arrays, one entry per event, built once and queried many times
+
+    Built in a single pass over the documents. Types and lowercased
+    locations are stored as integer codes (type_codes and location_codes
+    map each distinct value to its code), so matching a preference is a
+    table lookup per event. tag_rows maps each tag to the rows carrying it.
+    The lowercased titles are joined into title_text, so finding a keyword
+    in every title is one regex scan instead of one str.find per event; the
+    rows matching a keyword are remembered for later queries.
+    """
+
+    def __init__(self, documents: Sequence[Dict[str, Any]]):
+        ids, types, locations, prices, starts, title_offsets, titles = [], [], [], [], [], [], []
+        type_codes: Dict[str, int] = {}
+        location_codes: Dict[str, int] = {}
+        tag_rows: Dict[str, List[int]] = {}
+        offset = 0
+        for i, doc in enumerate(documents):
+            ids.append(doc["_id"])
+            types.append(type_codes.setdefault(doc.get("type") or "", len(type_codes)))
+            locations.append(location_codes.setdefault((doc.get("location") or "").lower(), len(location_codes)))
+            prices.append(doc.get("price"))
+            starts.append(doc["startDate"].timestamp())
+            title = (doc.get("title") or "").lower().replace(_TITLE_SEPARATOR, " ")
+            titles.append(title)
+            title_offsets.append(offset)
+            offset += len(title) + 1
+            for tag in doc.get("tags") or ():
+                tag_rows.setdefault(tag, []).append(i)
+
+        self.ids = ids
+        self.types = np.array(types, dtype=np.int32)
+        self.locations = np.array(locations, dtype=np.int32)
+        # None becomes NaN, which no budget comparison matches
+        self.prices = np.array(prices, dtype=np.float64)
+        self.starts = np.array(starts, dtype=np.float64)
+        self.type_codes = type_codes
+        self.location_codes = location_codes
+        self.tag_rows = {tag: np.array(rows, dtype=np.intp) for tag, rows in tag_rows.items()}
+        self.title_text = _TITLE_SEPARATOR.join(titles)
+        self.title_offsets = np.array(title_offsets, dtype=np.int64)
+        self._rows_by_id: Optional[Dict[str, int]] = None
+        self._keyword_rows: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, event_id: str) -> Optional[int]:
+        """The row of an event given its id as a string, or None if it isn't in the columns"""
+        if self._rows_by_id is None:
+            self._rows_by_id = {str(event_id): row for row, event_id in enumerate(self.ids)}
+        return self._rows_by_id.get(event_id)
+
+    def title_rows(self, keyword: str) -> np.ndarray:
+        """Rows whose title contains keyword, case-insensitively"""
+        positions = [match.start() for match in re.finditer(re.escape(keyword.lower()), self.title_text)]
+        return np.searchsorted(self.title_offsets, positions, side="right") - 1
+
+    def keyword_rows(self, keyword: str) -> np.ndarray:
+        """Rows with keyword as a tag or in the title"""
+        rows = self._keyword_rows.get(keyword)
+        if rows is None:
+            rows = np.union1d(self.tag_rows.get(keyword, np.empty(0, dtype=np.intp)), self.title_rows(keyword))
+            if len(self._keyword_rows) >= _KEYWORD_CACHE_SIZE:
+                self._keyword_rows.clear()
+            self._keyword_rows[keyword] = rows
+        return rows
+
+    def type_table(self, event_types: Sequence[str]) -> np.ndarray:
+        """Lookup table over type codes, true for the given types"""
+        table = np.zeros(len(self.type_codes), dtype=bool)
+        table[[self.type_codes[t] for t in event_types if t in self.type_codes]] = True
+        return table
+
+
+def match_signals(columns: EventColumns, preferences: UserPreferences) -> Dict[str, np.ndarray]:
+    """Per-event signals in [0, 1] for the parts of the preferences that are set
+
+    - type: the event's type is one of the preferred types
+    - keywords: share of keywords found in the tags (exactly) or the title
+    - location: 1 if the event's location equals the preferred one, 0.5 if
+      it only contains it
+    - price: within the budget, cheaper relative to the maximum scores higher;
+      events without a price get a middling score
+    Filtering (candidate_mask) and scoring (score_events) share these.
+    """
+    n = len(columns)
+    signals: Dict[str, np.ndarray] = {}
+
+    if preferences.eventTypes:
+        signals["type"] = columns.type_table(preferences.eventTypes)[columns.types]
+
+    if preferences.keywords:
+        matched = np.zeros(n, dtype=np.float64)
+        for keyword in preferences.keywords:
+            matched[columns.keyword_rows(keyword)] += 1
+        signals["keywords"] = matched / len(preferences.keywords)
+
+    if preferences.location:
+        location = preferences.location.lower()
+        # Few distinct locations, so substring matching happens once per location, not per event
+        table = np.zeros(len(columns.location_codes), dtype=np.float64)
+        for name, code in columns.location_codes.items():
+            if name == location:
+                table[code] = 1.0
+            elif location in name:
+                table[code] = 0.5
+        signals["location"] = table[columns.locations]
+
+    budget_max = preferences.budget.get("max") if preferences.budget else None
+    if budget_max is not None:
+        if budget_max > 0:
+            fit = 1.0 - 0.5 * np.clip(columns.prices / budget_max, 0.0, 1.0)
+        else:
+            fit = (columns.prices == 0).astype(np.float64)
+        signals["price"] = np.where(np.isnan(columns.prices), 0.5, fit)
+
+    return signals
+
+
+def candidate_mask(
+    columns: EventColumns,
+    preferences: UserPreferences,
+    now: datetime,
+    signals: Dict[str, np.ndarray],
+    semantic: bool = False
+) -> np.ndarray:
+    """Which events pass the hard filters for the preferences
+
+    Events must be upcoming and within the location and budget. They must
+    also match at least one preferred type or keyword; for semantic
+    candidates, which were found by meaning, only the type is required.
+    """
+    mask = columns.starts >= now.timestamp()
+
+    if "location" in signals:
+        mask &= signals["location"] > 0
+
+    if preferences.budget:
+        # NaN prices compare false, so events without a price are excluded, as in MongoDB
+        if preferences.budget.get("min") is not None:
+            mask &= columns.prices >= preferences.budget["min"]
+        if preferences.budget.get("max") is not None:
+            mask &= columns.prices <= preferences.budget["max"]
+
+    if semantic:
+        if "type" in signals:
+            mask &= signals["type"]
+    elif "type" in signals or "keywords" in signals:
+        relevant = np.zeros(len(columns), dtype=bool)
+        if "type" in signals:
+            relevant |= signals["type"]
+        if "keywords" in signals:
+            relevant |= signals["keywords"] > 0
+        mask &= relevant
+
+    return mask
+
+
+def score_events(
+    columns: EventColumns,
+    preferences: UserPreferences,
+    now: datetime,
+    similarity: Optional[Sequence[float]] = None,
+    signals: Optional[Dict[str, np.ndarray]] = None,
+    rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Relevance of events to the preferences, computed for the whole batch at once
+
+    Scores every event, or only `rows` (in that order) when given. Each
+    signal from match_signals is weighted by RANKING_WEIGHTS, plus:
+    - time: sooner events score higher, decaying exponentially
+    - similarity: cosine similarity to the query text, one per scored event,
+      when the candidates come from semantic search
+    Apart from time, signals the preferences say nothing about are 0 for every event.
+    """
+    if signals is None:
+        signals = match_signals(columns, preferences)
+    starts = columns.starts if rows is None else columns.starts[rows]
+
+    scores = np.zeros(len(starts), dtype=np.float64)
+    if len(starts) == 0:
+        return scores
+
+    for name, signal in signals.items():
+        scores += RANKING_WEIGHTS[name] * (signal if rows is None else signal[rows])
+
+    days_away = np.maximum(starts - now.timestamp(), 0.0) / 86400
+    scores += RANKING_WEIGHTS["time"] * np.exp2(-days_away / RANKING_TIME_DECAY_DAYS)
+
+    if similarity is not None:
+        scores += RANKING_WEIGHTS["similarity"] * np.clip(np.asarray(similarity, dtype=np.float64), 0.0, 1.0)
+
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> List[int]:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+
+    # Ties within the top k keep candidate order, which is soonest first
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.lexsort((top, -scores[top]))].tolist()
@@ -1,3 +1,231 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.models.event import Event
+from app.models.user import UserPreferences
+from app.services.embedding_index import index_events, semantic_search
+from app.services.event_ranking import (
+    CANDIDATE_FIELDS,
+    EventColumns,
+    candidate_mask,
+    match_signals,
+    score_events,
+    top_k,
+)
+
+# Load environment variables
+load_dotenv()
+
+# How many semantic candidates to fetch per requested result before filtering
+SEMANTIC_CANDIDATE_FACTOR = 20
+
+# Cosine similarity below which a semantic neighbour doesn't count as matching;
+# the nearest neighbours of any text exist even when nothing is relevant
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.35"))
+
+# Ranking reads upcoming events from an in-memory pool, rebuilt when this old
+EVENT_POOL_TTL_SECONDS = float(os.getenv("EVENT_POOL_TTL_SECONDS", "60"))
+EVENT_POOL_MAX = int(os.getenv("EVENT_POOL_MAX", "50000"))  # soonest upcoming events kept
+
+
+class EventPool:
+    """The soonest upcoming events as EventColumns, shared by every ranking query in the process
+
+    Hard filters and scoring run on the columns with NumPy instead of a
+    MongoDB query per preference set. The pool is rebuilt when it is older
+    than ttl_seconds (or after invalidate()), so an event added, changed or
+    deleted meanwhile is ranked on its old fields, or not at all, until then;
+    deleted winners are dropped when they are fetched in full.
+    """
+
+    def __init__(self, ttl_seconds: float = EVENT_POOL_TTL_SECONDS, max_events: int = EVENT_POOL_MAX):
+        self.ttl = ttl_seconds
+        self.max_events = max_events
+        self.columns: Optional[EventColumns] = None
+        self.builds = 0
+        self._db = None
+        self._built_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _fresh(self, db) -> bool:
+        return self.columns is not None and self._db is db and time.monotonic() - self._built_at < self.ttl
+
+    async def get(self, db) -> EventColumns:
+        if self._fresh(db):
+            return self.columns
+        
+        # Created here rather than in __init__, which runs at import outside any event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        # Concurrent queries wait for one rebuild
+        async with self._lock:
+            if not self._fresh(db):
+                documents = await db.events.find(
+                    {"startDate": {"$gte": datetime.utcnow()}}, CANDIDATE_FIELDS
+                ).sort("startDate", 1).limit(self.max_events).to_list(length=None)
+                # Tens of thousands of events take a while; keep the loop free meanwhile
+                self.columns = await asyncio.get_running_loop().run_in_executor(None, EventColumns, documents)
+                self._db = db
+                self._built_at = time.monotonic()
+                self.builds += 1
+        return self.columns
+
+    def invalidate(self) -> None:
+        """Rebuild the pool on its next use"""
+        self.columns = None
+
+
+# Shared by every caller in the process
+event_pool = EventPool()
+
+
+async def _fetch_events(db, event_ids: List[Any]) -> List[Event]:
+    """Fetch events in full, in the given order, skipping any deleted since they were ranked"""
+    documents = {doc["_id"]: doc for doc in await db.events.find({"_id": {"$in": event_ids}}).to_list(length=None)}
+    return [_to_event(documents[event_id]) for event_id in event_ids if event_id in documents]
+
+
+async def rank_events(
+    db,
+    preferences: UserPreferences,
+    limit: int,
+    pool: Optional[EventColumns] = None
+) -> List[Event]:
+    """The best `limit` upcoming events for the preferences, filtered and scored over the event pool"""
+    columns = pool if pool is not None else await event_pool.get(db)
+    now = datetime.utcnow()
+    
+    signals = match_signals(columns, preferences)
+    rows = np.flatnonzero(candidate_mask(columns, preferences, now, signals))
+    if len(rows) == 0:
+        return []
+    
+    scores = score_events(columns, preferences, now, signals=signals, rows=rows)
+    # Only the winners are fetched in full
+    return await _fetch_events(db, [columns.ids[rows[i]] for i in top_k(scores, limit)])
+
+
+def _to_event(document: Dict[str, Any]) -> Event:
+    document["id"] = str(document.pop("_id"))
+    return Event(**document)
+
+
+async def find_matching_events(
+    db,
+    user_id: str,
+    preferences: UserPreferences,
+    limit: int = 10,
+    query_text: Optional[str] = None,
+    pool: Optional[EventColumns] = None
+) -> List[Event]:
+    """Find upcoming events matching a user's preferences
+
+    When the embedding index is available, keywords (or the user's free text)
+    are matched semantically, so "live music" finds events of type "music":
+    events at least SEMANTIC_MIN_SCORE similar to the text that pass the
+    type, location, budget and date filters are ranked with their similarity
+    as one of the signals. Otherwise, or when no event is similar enough,
+    upcoming events in the location and budget that match a type or keyword
+    are ranked by how well they match (see app.services.event_ranking).
+    Both work on the event pool; pass `pool` to use a given snapshot of it.
+    """
+    text = query_text or " ".join((preferences.eventTypes or []) + (preferences.keywords or []))
+    
+    if text:
+        candidates = await semantic_search(text, limit * SEMANTIC_CANDIDATE_FACTOR)
+        similarities = {event_id: score for event_id, score in candidates or [] if score >= SEMANTIC_MIN_SCORE}
+        if similarities:
+            columns = pool if pool is not None else await event_pool.get(db)
+            now = datetime.utcnow()
+            signals = match_signals(columns, preferences)
+            mask = candidate_mask(columns, preferences, now, signals, semantic=True)
+            
+            # Rows in pool order, so ties go to the soonest event
+            found = sorted(
+                (row, similarities[event_id]) for event_id in similarities
+                if (row := columns.row_of(event_id)) is not None and mask[row]
+            )
+            if found:
+                rows = np.array([row for row, _ in found], dtype=np.intp)
+                similarity = [score for _, score in found]
+                scores = score_events(columns, preferences, now, similarity=similarity, signals=signals, rows=rows)
+                return await _fetch_events(db, [columns.ids[rows[i]] for i in top_k(scores, limit)])
+    
+    return await rank_events(db, preferences, limit, pool=pool)
+
+
+def canonical_preferences(preferences: UserPreferences) -> UserPreferences:
+    """The preferences reduced to what matching depends on, in a canonical form
+
+    Lists are de-duplicated and sorted ($in doesn't care about order),
+    empty values dropped and the location lower-cased (it is matched
+    case-insensitively). Types and keywords keep their case because tags
+    are matched exactly. frequency and maxDistance don't affect matching.
+    """
+    budget = {
+        bound: float(preferences.budget[bound])
+        for bound in ("min", "max")
+        if preferences.budget and preferences.budget.get(bound) is not None
+    }
+    return UserPreferences(
+        eventTypes=sorted(set(preferences.eventTypes or [])),
+        location=preferences.location.lower() if preferences.location else None,
+        budget=budget or None,
+        keywords=sorted(set(preferences.keywords or [])) or None,
+    )
+
+
+def preference_key(preferences: UserPreferences) -> str:
+    """Hash identifying the set of events a user's preferences match"""
+    canonical = canonical_preferences(preferences).dict(exclude={"frequency", "maxDistance"})
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class PreferenceGroupMatcher:
+    """Match each distinct preference set once and share the result with every user holding it
+
+    Meant for one pass over many users, such as a scheduler run: every
+    preference set is matched against one snapshot of the event pool, taken
+    at the first match, and results are kept for the lifetime of the
+    matcher, so events added meanwhile are only seen by the next run.
+    """
+
+    def __init__(self, db, limit: int):
+        self.db = db
+        self.limit = limit
+        self.pool: Optional[EventColumns] = None
+        self._matches: Dict[str, List[Event]] = {}
+        self.users = 0
+
+    async def match(self, preferences: UserPreferences) -> List[Event]:
+        self.users += 1
+        key = preference_key(preferences)
+        if key not in self._matches:
+            if self.pool is None:
+                self.pool = await event_pool.get(self.db)
+            # find_matching_events only looks at the preferences, not the user
+            self._matches[key] = await find_matching_events(
+                self.db, key, canonical_preferences(preferences), limit=self.limit, pool=self.pool
+            )
+        return self._matches[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": self.users,
+            "distinctPreferences": len(self._matches),
+            "matchesReused": self.users - len(self._matches),
+        }
+
+
 async def generate_mock_events(db) -> List[str]:
     """Generate mock events focused on Atlanta and Atlantic City"""
     events = [
@@ -93,4 +321,8 @@ async def generate_mock_events(db) -> List[str]:
         result = await db.events.insert_one(event_data)
         event_ids.append(str(result.inserted_id))
     
+    # insert_one sets _id on each dict, so they can be embedded directly
+    await index_events(events)
+    event_pool.invalidate()
+    
     return event_ids
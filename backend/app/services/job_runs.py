@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.services.metrics import JobRun
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Job run settings
+JOB_LOCK_TTL_SECONDS = int(os.getenv("JOB_LOCK_TTL_SECONDS", "300"))  # renewed every third of this
+JOB_CHECKPOINT_EVERY = int(os.getenv("JOB_CHECKPOINT_EVERY", "50"))  # users between checkpoints
+JOB_RUNS_TTL_DAYS = int(os.getenv("JOB_RUNS_TTL_DAYS", "30"))
+
+# Identifies this process as a lock owner
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def init_job_runs(db) -> None:
+    """Create indexes for run history lookups and expiry"""
+    await db["job_runs"].create_index([("job", 1), ("status", 1), ("startedAt", -1)])
+    await db["job_runs"].create_index("startedAt", expireAfterSeconds=JOB_RUNS_TTL_DAYS * 86400)
+
+
+class JobLock:
+    """A lease on a job in the job_locks collection, so only one scheduler runs it at a time
+
+    The lease expires unless renewed, so a crashed holder can't block the
+    job for longer than JOB_LOCK_TTL_SECONDS.
+    """
+
+    def __init__(self, db, job: str, ttl_seconds: int = JOB_LOCK_TTL_SECONDS):
+        self.db = db
+        self.job = job
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.held = False
+        self._renewer: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            # Matches only a free or expired lease; otherwise the upsert hits the existing _id
+            await self.db["job_locks"].find_one_and_update(
+                {"_id": self.job, "$or": [{"lockedUntil": {"$lt": now}}, {"owner": _OWNER}]},
+                {"$set": {"owner": _OWNER, "lockedAt": now, "lockedUntil": now + self.ttl}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False
+
+        self.held = True
+        self._renewer = asyncio.create_task(self._renew_loop())
+        return True
+
+    async def _renew_loop(self) -> None:
+        while self.held:
+            await asyncio.sleep(self.ttl.total_seconds() / 3)
+            try:
+                result = await self.db["job_locks"].update_one(
+                    {"_id": self.job, "owner": _OWNER},
+                    {"$set": {"lockedUntil": datetime.utcnow() + self.ttl}}
+                )
+                if result.matched_count == 0:
+                    logger.error(f"Lost the {self.job} lock to another scheduler")
+                    self.held = False
+            except Exception as e:
+                # Keep the lease until it would have expired; the next renewal may succeed
+                logger.error(f"Error renewing {self.job} lock: {e}")
+
+    async def release(self) -> None:
+        if self._renewer:
+            self._renewer.cancel()
+        if self.held:
+            self.held = False
+            await self.db["job_locks"].delete_one({"_id": self.job, "owner": _OWNER})
+
+
+class JobExecution:
+    """One run of a job: its job_runs document, checkpoint and counters
+
+    Users are read in _id order and the last processed _id is saved every
+    JOB_CHECKPOINT_EVERY users, so a run that dies part way can be resumed
+    by the next one from roughly where it stopped.
+    """
+
+    def __init__(self, db, job: str, lock: JobLock, run: JobRun):
+        self.db = db
+        self.job = job
+        self.lock = lock
+        self.run = run
+        self.id = uuid.uuid4().hex
+        self.resume_after: Any = None
+        self.resumed_from: Optional[str] = None
+        self.last_id: Any = None
+        self.errors = 0
+        # Optional callable returning job-specific figures to store with the run
+        self.details: Optional[Callable[[], Dict[str, Any]]] = None
+
+    async def start(self, resume_within: timedelta) -> None:
+        """Record the run, resuming an interrupted one that started within resume_within"""
+        runs = self.db["job_runs"]
+        now = datetime.utcnow()
+
+        # We hold the lock, so any run still marked running died without finishing
+        await runs.update_many(
+            {"job": self.job, "status": "running"},
+            {"$set": {"status": "interrupted", "finishedAt": now}}
+        )
+
+        # Runs skipped by other schedulers while that one held the lock don't count
+        previous = await runs.find_one({"job": self.job, "status": {"$ne": "skipped"}}, sort=[("startedAt", -1)])
+        if (
+            previous
+            and previous["status"] == "interrupted"
+            and previous.get("lastId") is not None
+            and previous["startedAt"] >= now - resume_within
+        ):
+            self.resume_after = previous["lastId"]
+            self.resumed_from = previous["_id"]
+            logger.info(f"Resuming {self.job} run {self.resumed_from} after _id {self.resume_after}")
+
+        await runs.insert_one({
+            "_id": self.id,
+            "job": self.job,
+            "owner": _OWNER,
+            "status": "running",
+            "startedAt": now,
+            "resumedFrom": self.resumed_from,
+            "lastId": self.resume_after,
+            "usersProcessed": 0,
+            "notificationsQueued": 0,
+            "userErrors": 0,
+        })
+
+    async def users(self, query: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate the users matching query, checkpointing as they are processed
+
+        A user counts as processed once the caller asks for the next one.
+        Raises if the lock was lost, leaving the rest to the lock's new holder.
+        """
+        if self.resume_after is not None:
+            query = {**query, "_id": {"$gt": self.resume_after}}
+
+        since_checkpoint = 0
+        async for user_doc in self.db["users"].find(query).sort("_id", 1):
+            if not self.lock.held:
+                raise RuntimeError(f"Lost the {self.job} lock")
+
+            yield user_doc
+
+            self.last_id = user_doc["_id"]
+            since_checkpoint += 1
+            if since_checkpoint >= JOB_CHECKPOINT_EVERY:
+                await self.checkpoint()
+                since_checkpoint = 0
+
+    def user_failed(self) -> None:
+        self.errors += 1
+        self.run.user_failed()
+
+    def _progress(self) -> Dict[str, Any]:
+        progress = {
+            "usersProcessed": self.run.users,
+            "notificationsQueued": self.run.notifications,
+            "userErrors": self.errors,
+        }
+        if self.last_id is not None:
+            progress["lastId"] = self.last_id
+        if self.details is not None:
+            progress["details"] = self.details()
+        return progress
+
+    async def checkpoint(self) -> None:
+        await self.db["job_runs"].update_one({"_id": self.id}, {"$set": self._progress()})
+
+    async def finish(self, status: str) -> None:
+        now = datetime.utcnow()
+        await self.db["job_runs"].update_one(
+            {"_id": self.id},
+            {"$set": {**self._progress(), "status": status, "finishedAt": now}}
+        )
+
+
+@asynccontextmanager
+async def job_execution(db, job: str, run: JobRun, resume_within: timedelta) -> AsyncIterator[Optional[JobExecution]]:
+    """Lock a job and record its run; yields None if another scheduler holds the lock
+
+    A skipped run is recorded too, with status "skipped" and this process as
+    owner, so run history shows which schedulers tried and when.
+
+    Exceptions escaping the block mark the run as interrupted, leaving its
+    checkpoint for the next run to resume from.
+    """
+    lock = JobLock(db, job)
+    if not await lock.acquire():
+        logger.info(f"Skipping {job}: another scheduler is running it")
+        run.outcome = "skipped"
+        now = datetime.utcnow()
+        await db["job_runs"].insert_one({
+            "_id": uuid.uuid4().hex,
+            "job": job,
+            "owner": _OWNER,
+            "status": "skipped",
+            "startedAt": now,
+            "finishedAt": now,
+        })
+        yield None
+        return
+
+    execution = JobExecution(db, job, lock, run)
+    try:
+        await execution.start(resume_within)
+        try:
+            yield execution
+        except BaseException:
+            await execution.finish("interrupted")
+            raise
+        await execution.finish("partial" if execution.errors else "ok")
+    finally:
+        await lock.release()
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Batched inference against a self-hosted, OpenAI-compatible completions server
+# (vLLM, TGI, llama.cpp server...); batching is disabled when no URL is set
+LLM_BATCH_URL = os.getenv("LLM_BATCH_URL", "")
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "10"))
+LLM_BATCH_MAX_CONCURRENCY = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "4"))  # batch requests in flight
+
+BatchBackend = Callable[[List[str]], Awaitable[List[str]]]
+
+
+class PreferenceBatcher:
+    """Collect concurrent prompts into one batched model call
+
+    Prompts submitted within max_wait_ms of the first one (or until
+    max_batch_size is reached) are sent together, and each result is handed
+    back to the coroutine that submitted it. At most max_concurrency batches
+    are sent to the model server at once; later ones wait for a slot.
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        max_batch_size: int = LLM_BATCH_MAX_SIZE,
+        max_wait_ms: float = LLM_BATCH_MAX_WAIT_MS,
+        max_concurrency: int = LLM_BATCH_MAX_CONCURRENCY
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.total_latency = 0.0
+
+    async def submit(self, prompt: str) -> str:
+        """Queue a prompt for the next batch and wait for its completion"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        async with self.semaphore:
+            # Callers whose deadline passed while waiting for a slot no longer need an answer
+            batch = [(prompt, future) for prompt, future in batch if not future.done()]
+            if batch:
+                await self._send(batch)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        start_time = time.perf_counter()
+        try:
+            results = await self.backend([prompt for prompt, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Backend returned {len(results)} results for {len(batch)} prompts")
+        except Exception as e:
+            self.failures += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self.total_latency += time.perf_counter() - start_time
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have given up on its deadline in the meantime
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """Batch size and latency stats"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "avgBatchSize": self.items / self.batches if self.batches else None,
+            "avgBatchLatency": self.total_latency / self.batches if self.batches else None,
+        }
+
+
+def completions_backend(url: str, model_id: str, client: Optional[httpx.AsyncClient] = None) -> BatchBackend:
+    """Build a backend that sends a batch of prompts to an OpenAI-compatible /v1/completions endpoint"""
+    http_client = client or httpx.AsyncClient(timeout=60)
+
+    async def call(prompts: List[str]) -> List[str]:
+        response = await http_client.post(url, json={
+            "model": model_id,
+            "prompt": prompts,
+            "temperature": 0.5,
+            "max_tokens": 512,
+        })
+        response.raise_for_status()
+        choices = sorted(response.json()["choices"], key=lambda choice: choice["index"])
+        return [choice["text"] for choice in choices]
+
+    return call
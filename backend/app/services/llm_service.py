@@ -1,24 +1,36 @@
 from typing import Dict, List, Optional, Any
+import asyncio
 import os
 from dotenv import load_dotenv
 import json
-from langchain.llms import HuggingFaceHub
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.metrics import LLM_REQUEST_DURATION, PREFERENCE_EXTRACTIONS
+from app.services.llm_batcher import LLM_BATCH_URL, PreferenceBatcher, completions_backend
+from app.services.preference_cache import PreferenceCache
+from app.services.rule_extractor import RULE_CONFIDENCE_THRESHOLD, rule_extractor
 
 # Load environment variables
 load_dotenv()
 
+# Per-call deadline (including time spent waiting for a slot) and max in-flight calls
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+LLM_MODEL_ID = os.getenv("LLM_MODEL_ID", "mistralai/Mistral-7B-Instruct-v0.2")
+
 # Setup LLM
 def get_llm():
     """Get LLM model for preference extraction"""
     try:
+        # Imported here so processes that never call the LLM don't load langchain
+        from langchain.llms import HuggingFaceHub
+        
         # Using HuggingFaceHub as an example
         # You can replace this with another open-source LLM implementation
-        model_id = "mistralai/Mistral-7B-Instruct-v0.2"
-        
         llm = HuggingFaceHub(
-            repo_id=model_id,
+            repo_id=LLM_MODEL_ID,
             huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
             model_kwargs={"temperature": 0.5, "max_new_tokens": 512}
         )
@@ -50,26 +62,200 @@ Output the extracted information in JSON format with the following structure:
 If any information is not provided, omit that field from the JSON.
 """
 
+class LLMClientManager:
+    """Process-wide LLM client and compiled prompt, created once and reused
+
+    Building a HuggingFaceHub client per message also builds a new HTTP
+    session and config each time; keeping one client lets requests reuse
+    pooled connections so each message only pays for inference.
+
+    The client is synchronous, so async callers go through ainvoke(), which
+    runs it on a bounded thread pool and never lets more than
+    LLM_MAX_CONCURRENCY calls be in flight.
+
+    The manager is created at import, outside any event loop, so its asyncio
+    primitives are created on first use from the loop instead.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._astart_lock: Optional[asyncio.Lock] = None
+        self._start_lock = threading.Lock()
+        self.in_flight = 0
+        self.timeouts = 0
+        self.llm = None
+        self.prompt = None
+        self.started = False
+        self.calls = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_error = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def start(self) -> None:
+        """Create the client and prompt"""
+        # format_prompt() may get here from several pool threads at once
+        with self._start_lock:
+            if self.started:
+                return
+            
+            from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+            
+            # With a batch server configured, completions go through llm_batcher instead
+            self.llm = None if LLM_BATCH_URL else get_llm()
+            self.prompt = ChatPromptTemplate.from_messages([
+                SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT),
+                HumanMessagePromptTemplate.from_template("{input}")
+            ])
+            self.started = True
+
+    async def astart(self, warmup: bool = False) -> None:
+        """Create the client off the event loop, optionally sending a warmup request"""
+        if self._astart_lock is None:
+            self._astart_lock = asyncio.Lock()
+        
+        # Concurrent first messages wait for one start instead of each building a client
+        async with self._astart_lock:
+            if not self.started:
+                # Creating the client may itself make HTTP calls
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.start)
+        
+        if warmup and self.available:
+            try:
+                # The first request to a hosted model is often a cold start
+                await self.ainvoke("I'm interested in jazz concerts in Atlanta", timeout=None)
+                print(f"LLM warmed up in {self.last_latency:.2f}s")
+            except Exception as e:
+                print(f"LLM warmup failed: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self.llm is not None
+
+    def format_prompt(self, user_message: str) -> str:
+        """Render the preference extraction prompt for a message"""
+        if not self.started:
+            self.start()
+        
+        return self.prompt.format_prompt(input=user_message).to_string()
+
+    def invoke(self, user_message: str) -> str:
+        """Run the preference extraction prompt and return the raw completion"""
+        prompt = self.format_prompt(user_message)
+        
+        start_time = time.perf_counter()
+        try:
+            response = self.llm(prompt)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            raise
+        finally:
+            self.calls += 1
+            self.last_latency = time.perf_counter() - start_time
+            self.total_latency += self.last_latency
+        
+        return response
+
+    async def ainvoke(self, user_message: str, timeout: Optional[float] = LLM_TIMEOUT_SECONDS) -> str:
+        """Run invoke() on the LLM thread pool without blocking the event loop
+
+        Raises asyncio.TimeoutError if no result arrives within the deadline.
+        A timed-out call keeps its slot until the thread actually finishes, so
+        slow completions can't pile up behind the limiter.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+            self.in_flight += 1
+            future = loop.run_in_executor(self.executor, self.invoke, user_message)
+            future.add_done_callback(self._release_slot)
+            
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _release_slot(self, _future) -> None:
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Health and latency stats for the LLM client"""
+        return {
+            "available": self.available,
+            "started": self.started,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "inFlight": self.in_flight,
+            "avgLatency": self.total_latency / self.calls if self.calls else None,
+            "lastLatency": self.last_latency,
+            "lastError": self.last_error,
+        }
+
+
+# Shared by every caller in the process
+llm_manager = LLMClientManager()
+preference_cache = PreferenceCache()
+llm_batcher = (
+    PreferenceBatcher(completions_backend(LLM_BATCH_URL, LLM_MODEL_ID))
+    if LLM_BATCH_URL else None
+)
+
+
 async def extract_preferences(user_message: str) -> Dict[str, Any]:
     """Extract user preferences from a message using LLM"""
+    # Repeat phrasings are answered from the cache without an LLM call
+    cached = await preference_cache.get(user_message)
+    if cached is not None:
+        PREFERENCE_EXTRACTIONS.labels("cache").inc()
+        return cached
+    
+    # Messages the compiled rules fully understand don't need the LLM
+    preferences, confidence = rule_extractor.extract(user_message)
+    if confidence >= RULE_CONFIDENCE_THRESHOLD:
+        PREFERENCE_EXTRACTIONS.labels("rules").inc()
+        return preferences
+    
     try:
-        llm = get_llm()
+        if not llm_manager.started:
+            await llm_manager.astart()
         
-        if not llm:
+        if llm_batcher is None and not llm_manager.available:
             # Fallback to rule-based extraction if LLM is not available
             return _fallback_preference_extraction(user_message)
         
-        # Create prompt
-        chat_prompt = ChatPromptTemplate.from_messages([
-            SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT),
-            HumanMessagePromptTemplate.from_template("{input}")
-        ])
-        
-        # Format prompt with user message
-        formatted_prompt = chat_prompt.format_prompt(input=user_message)
-        
-        # Get LLM response
-        response = llm(formatted_prompt.to_string())
+        # Get LLM response without blocking other chats
+        backend = "direct" if llm_batcher is None else "batch"
+        start_time = time.perf_counter()
+        try:
+            if llm_batcher is not None:
+                # Messages arriving together share one batched inference call
+                response = await asyncio.wait_for(
+                    llm_batcher.submit(llm_manager.format_prompt(user_message)),
+                    LLM_TIMEOUT_SECONDS
+                )
+            else:
+                response = await llm_manager.ainvoke(user_message)
+        except asyncio.TimeoutError:
+            LLM_REQUEST_DURATION.labels(backend, "timeout").observe(time.perf_counter() - start_time)
+            print(f"LLM call timed out after {LLM_TIMEOUT_SECONDS}s, using fallback extraction")
+            return _fallback_preference_extraction(user_message)
+        except Exception:
+            LLM_REQUEST_DURATION.labels(backend, "error").observe(time.perf_counter() - start_time)
+            raise
+        LLM_REQUEST_DURATION.labels(backend, "ok").observe(time.perf_counter() - start_time)
         
         # Extract JSON from response
         json_str = response.strip()
@@ -79,6 +265,10 @@ async def extract_preferences(user_message: str) -> Dict[str, Any]:
             json_str = json_str[:-3]
         
         preferences = json.loads(json_str)
+        
+        # Only LLM results are cached; fallback extraction is cheap to redo
+        await preference_cache.set(user_message, preferences)
+        PREFERENCE_EXTRACTIONS.labels("llm").inc()
         return preferences
     
     except Exception as e:
@@ -89,51 +279,6 @@ async def extract_preferences(user_message: str) -> Dict[str, Any]:
 
 def _fallback_preference_extraction(user_message: str) -> Dict[str, Any]:
     """Rule-based fallback for preference extraction when LLM is unavailable"""
-    # This is a simple implementation and would be more sophisticated in a real system
-    message = user_message.lower()
-    preferences = {}
-    
-    # Extract event types
-    event_types = []
-    if "concert" in message:
-        event_types.append("concert")
-    if "workshop" in message:
-        event_types.append("workshop")
-    if "conference" in message:
-        event_types.append("conference")
-    if "festival" in message:
-        event_types.append("festival")
-    if "sport" in message:
-        event_types.append("sports")
-    if "art" in message or "exhibition" in message:
-        event_types.append("art")
-    if "food" in message:
-        event_types.append("food")
-    
-    if event_types:
-        preferences["eventTypes"] = event_types
-    
-    # Extract location (very simplistic approach)
-    cities = ["new york", "san francisco", "los angeles", "chicago", "austin", "miami"]
-    for city in cities:
-        if city in message:
-            preferences["location"] = city.title()
-            break
-    
-    # Extract price/budget information
-    if "free" in message:
-        preferences["budget"] = {"max": 0}
-    elif "cheap" in message:
-        preferences["budget"] = {"max": 50}
-    
-    # Extract keywords
-    keywords = []
-    potential_keywords = ["jazz", "rock", "tech", "ai", "food", "wine", "family", "art"]
-    for keyword in potential_keywords:
-        if keyword in message:
-            keywords.append(keyword)
-    
-    if keywords:
-        preferences["keywords"] = keywords
-    
-    return preferences
\ No newline at end of file
+    PREFERENCE_EXTRACTIONS.labels("fallback").inc()
+    preferences, _ = rule_extractor.extract(user_message)
+    return preferences
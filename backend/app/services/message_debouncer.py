@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Debounce settings; a window of 0 disables merging
+MESSAGE_DEBOUNCE_MS = float(os.getenv("MESSAGE_DEBOUNCE_MS", "800"))
+MESSAGE_DEBOUNCE_MAX_MS = float(os.getenv("MESSAGE_DEBOUNCE_MAX_MS", "3000"))
+
+
+class _Burst:
+    __slots__ = ("texts", "first_at", "last_at", "closed", "consumed")
+
+    def __init__(self, now: float):
+        self.texts: List[str] = []
+        self.first_at = now
+        self.last_at = now
+        self.closed = False
+        self.consumed = False
+
+
+class MessageDebouncer:
+    """Merge free-text messages a chat sends in quick succession
+
+    Text messages are registered as they arrive (add), so a burst grows even
+    while the chat's earlier updates are still being processed. The first
+    message of a burst waits until the chat has been quiet for the window,
+    or the burst is max_wait old, then takes the whole burst as one text.
+    The other messages of the burst find it consumed and are skipped. Any
+    other update from the chat (a command, a button) closes the burst, so
+    merged text never jumps ahead of it.
+    """
+
+    def __init__(self, window_ms: float = MESSAGE_DEBOUNCE_MS, max_wait_ms: float = MESSAGE_DEBOUNCE_MAX_MS):
+        self.window = window_ms / 1000
+        self.max_wait = max_wait_ms / 1000
+        self._open: Dict[int, _Burst] = {}
+        self._bursts: Dict[Tuple[int, int], _Burst] = {}
+        self.messages = 0
+        self.cycles = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def add(self, chat_id: int, update_id: int, text: str) -> None:
+        """Register an incoming text message with its chat's open burst"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        burst = self._open.get(chat_id)
+        if burst is None:
+            burst = self._open[chat_id] = _Burst(now)
+        burst.texts.append(text)
+        burst.last_at = now
+        self._bursts[(chat_id, update_id)] = burst
+        self.messages += 1
+
+    def close(self, chat_id: int) -> None:
+        """Stop the chat's open burst from accepting more messages"""
+        burst = self._open.pop(chat_id, None)
+        if burst is not None:
+            burst.closed = True
+
+    def forget(self, chat_id: int, update_id: int) -> None:
+        """Drop a message that won't be handled; its text stays in the burst"""
+        self._bursts.pop((chat_id, update_id), None)
+
+    async def wait_quiet(self, chat_id: int, update_id: int) -> None:
+        """Wait until the message's burst is complete"""
+        burst = self._bursts.get((chat_id, update_id))
+        while burst is not None and not burst.closed and not burst.consumed:
+            remaining = min(burst.last_at + self.window, burst.first_at + self.max_wait) - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+
+    def take(self, chat_id: int, update_id: int, text: str) -> Optional[str]:
+        """Return the merged text to handle for a message, or None if it was already handled"""
+        burst = self._bursts.pop((chat_id, update_id), None)
+        if burst is None:
+            return text
+        if burst.consumed:
+            return None
+
+        burst.consumed = True
+        if self._open.get(chat_id) is burst:
+            del self._open[chat_id]
+        self.cycles += 1
+        return "\n".join(burst.texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "cycles": self.cycles,
+            "openBursts": len(self._open),
+        }
@@ -0,0 +1,37 @@
+import re
+
+from app.models.event import Event
+
+# Characters with a meaning in Telegram's (legacy) Markdown parse mode
+_MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+
+def escape_markdown(text: str) -> str:
+    """Escape text for a message sent with parse_mode="Markdown"
+
+    Same as telegram.helpers.escape_markdown, without importing
+    python-telegram-bot into the API process.
+    """
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def format_event(event: Event) -> str:
+    """Format one event as Markdown, with the event's own text escaped"""
+    event_message = (
+        f"🎭 *{escape_markdown(event.title)}*\n"
+        f"📝 {escape_markdown(event.description[:100])}...\n"
+        f"📍 {escape_markdown(event.location)}"
+    )
+
+    if event.venue:
+        event_message += f" ({escape_markdown(event.venue)})"
+
+    event_message += f"\n📅 {event.startDate.strftime('%Y-%m-%d %H:%M')}"
+
+    if event.price is not None:
+        event_message += f"\n💰 {'Free' if event.price == 0 else f'${event.price:.2f}'}"
+
+    if event.url:
+        event_message += f"\n🔗 [More Info]({event.url})"
+
+    return event_message
@@ -0,0 +1,184 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Side ports for processes without an HTTP API; 0 disables the endpoint
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "9101"))
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "9102"))
+DELIVERY_METRICS_PORT = int(os.getenv("DELIVERY_METRICS_PORT", "9103"))
+
+# Shared buckets for calls that range from sub-millisecond to tens of seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "API requests being handled", ["method", "route"])
+
+# MongoDB
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ["command", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_POOL_OPEN = Gauge("mongodb_pool_connections_open", "Open MongoDB connections")
+MONGO_POOL_CHECKED_OUT = Gauge("mongodb_pool_connections_checked_out", "MongoDB connections in use")
+MONGO_POOL_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time waiting for a MongoDB connection", buckets=LATENCY_BUCKETS
+)
+
+# LLM
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Preference extraction LLM latency, including queueing",
+    ["backend", "outcome"], buckets=LATENCY_BUCKETS
+)
+PREFERENCE_EXTRACTIONS = Counter(
+    "preference_extractions_total", "Preference extractions by the path that answered", ["source"]
+)
+
+# Telegram
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "telegram_request_duration_seconds", "Telegram Bot API call latency", ["method", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+TELEGRAM_RATE_LIMITED = Counter("telegram_rate_limited_total", "Telegram 429 responses", ["method"])
+TELEGRAM_UPDATES_WAITING = Gauge("telegram_updates_waiting", "Updates accepted but not started")
+TELEGRAM_UPDATES_IN_FLIGHT = Gauge("telegram_updates_in_flight", "Updates being handled")
+TELEGRAM_UPDATE_WAIT = Histogram(
+    "telegram_update_wait_seconds", "Time from receiving an update to handling it", buckets=LATENCY_BUCKETS
+)
+TELEGRAM_UPDATES_DROPPED = Counter("telegram_updates_dropped_total", "Updates not handled", ["reason"])
+
+# Scheduler
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds", "Scheduler job run time", ["job"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600)
+)
+SCHEDULER_JOB_RUNS = Counter("scheduler_job_runs_total", "Scheduler job runs", ["job", "outcome"])
+SCHEDULER_USERS_PROCESSED = Counter("scheduler_users_processed_total", "Users checked by scheduler jobs", ["job"])
+SCHEDULER_NOTIFICATIONS_QUEUED = Counter(
+    "scheduler_notifications_queued_total", "Notifications queued by scheduler jobs", ["job"]
+)
+SCHEDULER_USER_ERRORS = Counter("scheduler_user_errors_total", "Users a scheduler job failed to process", ["job"])
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Record the duration of every MongoDB command the process runs"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+
+command_metrics = CommandMetrics()
+
+
+def _route_template(scope) -> str:
+    """The path template of the route a request matches, to keep label values bounded"""
+    app = scope.get("app")
+    if app is None:
+        return "unmatched"
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start_time)
+
+
+class JobRun:
+    """Counters for one run of a scheduler job"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.outcome = "ok"
+        self.users = 0
+        self.notifications = 0
+        self.user_errors = 0
+
+    def user_processed(self) -> None:
+        self.users += 1
+        SCHEDULER_USERS_PROCESSED.labels(self.job).inc()
+
+    def notification_queued(self) -> None:
+        self.notifications += 1
+        SCHEDULER_NOTIFICATIONS_QUEUED.labels(self.job).inc()
+
+    def user_failed(self) -> None:
+        self.user_errors += 1
+        SCHEDULER_USER_ERRORS.labels(self.job).inc()
+
+
+@contextmanager
+def track_job(job: str) -> Iterator[JobRun]:
+    """Time a scheduler job run and record its outcome"""
+    run = JobRun(job)
+    start_time = time.perf_counter()
+    try:
+        yield run
+    except Exception:
+        run.outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start_time
+        SCHEDULER_JOB_DURATION.labels(job).observe(elapsed)
+        SCHEDULER_JOB_RUNS.labels(job, run.outcome).inc()
+        logger.info(
+            f"Job {job} finished in {elapsed:.2f}s ({run.outcome}): "
+            f"{run.users} users ({run.user_errors} failed), {run.notifications} notifications queued"
+        )
+
+
+def serve_metrics(port: int) -> None:
+    """Serve /metrics on a side port from a background thread"""
+    if port:
+        start_http_server(port)
+        logger.info(f"Serving metrics on port {port}")
@@ -1,8 +1,17 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from fastapi import FastAPI
 import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
 from dotenv import load_dotenv
 
+from app.services.metrics import MONGO_POOL_CHECKED_OUT, MONGO_POOL_OPEN, MONGO_POOL_WAIT, command_metrics
+from app.services.profiling import profile_command_listener
+
 # Load environment variables
 load_dotenv()
 
@@ -10,11 +19,161 @@ load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "event_assistant")
 
+# Connection pool settings, shared by the API, bot, scheduler and delivery worker
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "")  # e.g. "zstd,snappy,zlib"
+
+# Notifications older than this are expired by MongoDB's TTL monitor. TTL
+# deletes bypass notificationStats, so a notification still pending when it
+# expires (only if delivery workers were down for the whole retention period)
+# stays counted in its user's pending counter
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool utilization and checkout wait times, from pymongo's pool events
+
+    Checkouts happen on the thread that runs the operation, so the start of
+    a checkout is kept per thread to time the wait for a connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wait_times: deque = deque(maxlen=1000)
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures: Counter = Counter()
+        self.cleared = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _end_wait(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        wait = self._end_wait()
+        with self._lock:
+            self.checkout_failures[str(event.reason)] += 1
+            self.wait_max = max(self.wait_max, wait)
+
+    def connection_checked_out(self, event):
+        wait = self._end_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._wait_times.append(wait)
+        MONGO_POOL_WAIT.observe(wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+                "open": self.open,
+                "checkedOut": self.checked_out,
+                "maxCheckedOut": self.max_checked_out,
+                "utilization": self.checked_out / MONGODB_MAX_POOL_SIZE if MONGODB_MAX_POOL_SIZE else None,
+                "checkouts": self.checkouts,
+                "checkoutFailures": dict(self.checkout_failures),
+                "poolCleared": self.cleared,
+                "waitAvgMs": self.wait_total / self.checkouts * 1000 if self.checkouts else None,
+                "waitP95Ms": waits[int(len(waits) * 0.95)] * 1000 if waits else None,
+                "waitMaxMs": self.wait_max * 1000,
+            }
+
+
+# One listener and one client per process
+pool_metrics = PoolMetrics()
+_client: Optional[AsyncIOMotorClient] = None
+
+MONGO_POOL_OPEN.set_function(lambda: pool_metrics.open)
+MONGO_POOL_CHECKED_OUT.set_function(lambda: pool_metrics.checked_out)
+
+
+def get_client(app_name: str = "event-assistant") -> AsyncIOMotorClient:
+    """Get this process's MongoDB client, creating it on first use"""
+    global _client
+    if _client is None:
+        options: Dict[str, Any] = {
+            "appname": app_name,
+            "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS,
+            "readPreference": MONGODB_READ_PREFERENCE,
+            "event_listeners": [pool_metrics, command_metrics, profile_command_listener],
+        }
+        if MONGODB_COMPRESSORS:
+            options["compressors"] = MONGODB_COMPRESSORS
+        _client = AsyncIOMotorClient(MONGODB_URI, **options)
+    return _client
+
+
+def get_database(app_name: str = "event-assistant") -> AsyncIOMotorDatabase:
+    """Get the application database on this process's shared client"""
+    return get_client(app_name)[DATABASE_NAME]
+
+
+def close_client() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
 
 async def init_db(app: FastAPI):
     """Initialize MongoDB connection"""
     # Connect to MongoDB
-    app.mongodb_client = AsyncIOMotorClient(MONGODB_URI)
+    app.mongodb_client = get_client("event-assistant-api")
     app.mongodb = app.mongodb_client[DATABASE_NAME]
     
     # Create indexes
@@ -23,15 +182,31 @@ async def init_db(app: FastAPI):
     await app.mongodb["events"].create_index("location")
     await app.mongodb["events"].create_index("type")
     await app.mongodb["events"].create_index("startDate")
-    await app.mongodb["notifications"].create_index("userId")
+    # Serves GET /notifications?userId= sorted by sentAt without an in-memory sort
+    await app.mongodb["notifications"].create_index([("userId", 1), ("sentAt", -1)])
     await app.mongodb["notifications"].create_index("eventId")
-    await app.mongodb["notifications"].create_index("sentAt")
+    await _ensure_notification_ttl(app.mongodb)
     
     print("Connected to MongoDB!")
 
 
-async def get_db():
-    """Get MongoDB database"""
-    # This function would be used with FastAPI Depends
-    # but for simplicity, we'll access the DB directly from the app
-    pass
\ No newline at end of file
+async def _ensure_notification_ttl(db):
+    """Make the sentAt index a TTL index so old notifications expire continuously"""
+    expire_after = NOTIFICATION_RETENTION_DAYS * 24 * 60 * 60
+    indexes = await db["notifications"].index_information()
+    existing = indexes.get("sentAt_1")
+    
+    if existing is None:
+        await db["notifications"].create_index("sentAt", expireAfterSeconds=expire_after)
+    elif existing.get("expireAfterSeconds") != expire_after:
+        # Convert the plain index (or change the retention) in place, without a rebuild
+        await db.command(
+            "collMod",
+            "notifications",
+            index={"keyPattern": {"sentAt": 1}, "expireAfterSeconds": expire_after}
+        )
+
+
+async def get_db(request: Request) -> AsyncIOMotorDatabase:
+    """Get MongoDB database, for use with FastAPI Depends"""
+    return request.app.mongodb
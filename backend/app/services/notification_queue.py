@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+from app.models.event import Event
+from app.models.notification import Notification
+from app.services.message_format import format_event
+from app.services.repository import insert_document
+
+# Load environment variables
+load_dotenv()
+
+# Delivery queue settings
+DELIVERY_LEASE_SECONDS = int(os.getenv("DELIVERY_LEASE_SECONDS", "60"))
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "5"))
+DELIVERY_BACKOFF_BASE_SECONDS = float(os.getenv("DELIVERY_BACKOFF_BASE_SECONDS", "5"))
+DELIVERY_BACKOFF_MAX_SECONDS = float(os.getenv("DELIVERY_BACKOFF_MAX_SECONDS", "3600"))
+
+
+async def update_notification_stats(
+    db,
+    user_id: str,
+    inc: Dict[str, int],
+    last_sent_at: Optional[datetime] = None
+) -> None:
+    """Adjust the cached notification counters on a user document"""
+    if not ObjectId.is_valid(user_id):
+        return
+
+    update: Dict[str, Any] = {"$inc": {f"notificationStats.{k}": v for k, v in inc.items()}}
+    if last_sent_at is not None:
+        update["$max"] = {"notificationStats.lastSentAt": last_sent_at}
+
+    await db["users"].update_one({"_id": ObjectId(user_id)}, update)
+
+
+def format_event_message(event: Event) -> str:
+    """Format the Telegram message for an event notification, sent as Markdown"""
+    return "🎉 New Event Alert! 🎉\n\n" + format_event(event)
+
+
+async def init_delivery_queue(db) -> None:
+    """Create indexes used by delivery workers to claim notifications"""
+    await db["notifications"].create_index([("status", 1), ("nextAttemptAt", 1)])
+
+
+async def enqueue_notification(
+    db,
+    user_id: str,
+    chat_id: int,
+    event: Event,
+    type: str = "auto"
+) -> Dict[str, Any]:
+    """Store a pending notification that delivery workers will send
+
+    The notification document is the queue entry: it carries the chat id and
+    rendered text so workers can send it without further lookups.
+    """
+    now = datetime.utcnow()
+    notification = Notification(
+        userId=user_id,
+        eventId=event.id,
+        sentAt=now,
+        status="pending",
+        type=type
+    )
+
+    notification_dict = notification.dict()
+    notification_dict.pop("id")  # Remove id field
+    notification_dict.update({
+        "chatId": chat_id,
+        "text": format_event_message(event),
+        "nextAttemptAt": now,
+        "leaseUntil": None,
+        "worker": None,
+    })
+
+    created = await insert_document(db, "notifications", notification_dict)
+    await update_notification_stats(db, user_id, {"total": 1, "pending": 1})
+    return created
+
+
+async def claim_notification(db, worker_id: str) -> Optional[Dict[str, Any]]:
+    """Lease the next due notification, or return None if nothing is due"""
+    now = datetime.utcnow()
+    return await db["notifications"].find_one_and_update(
+        {
+            "status": "pending",
+            "nextAttemptAt": {"$lte": now},
+            "$or": [{"leaseUntil": None}, {"leaseUntil": {"$lt": now}}],
+        },
+        {
+            "$set": {
+                "worker": worker_id,
+                "leaseUntil": now + timedelta(seconds=DELIVERY_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("nextAttemptAt", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff in seconds for the given number of attempts"""
+    delay = DELIVERY_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return min(delay, DELIVERY_BACKOFF_MAX_SECONDS)
+
+
+async def mark_sent(db, notification: Dict[str, Any]) -> None:
+    """Mark a leased notification as delivered"""
+    now = datetime.utcnow()
+    result = await db["notifications"].update_one(
+        {"_id": notification["_id"], "worker": notification["worker"], "status": "pending"},
+        {"$set": {"status": "sent", "deliveredAt": now, "leaseUntil": None}}
+    )
+    if result.modified_count:
+        await update_notification_stats(db, notification["userId"], {"pending": -1}, last_sent_at=now)
+
+
+async def schedule_retry(db, notification: Dict[str, Any], delay: float, error: str) -> None:
+    """Release a leased notification so it is retried after a delay"""
+    await db["notifications"].update_one(
+        {"_id": notification["_id"], "worker": notification["worker"]},
+        {
+            "$set": {
+                "nextAttemptAt": datetime.utcnow() + timedelta(seconds=delay),
+                "leaseUntil": None,
+                "lastError": error,
+            }
+        }
+    )
+
+
+async def mark_failed(db, notification: Dict[str, Any], error: str) -> None:
+    """Dead-letter a notification that cannot be delivered"""
+    result = await db["notifications"].update_one(
+        {"_id": notification["_id"], "worker": notification["worker"], "status": "pending"},
+        {"$set": {"status": "failed", "leaseUntil": None, "lastError": error}}
+    )
+    if result.modified_count:
+        await update_notification_stats(db, notification["userId"], {"pending": -1, "failed": 1})
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Cache settings; the SQLite tier is only used when a path is configured
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "10000"))
+PREFERENCE_CACHE_TTL_SECONDS = float(os.getenv("PREFERENCE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+PREFERENCE_CACHE_PATH = os.getenv("PREFERENCE_CACHE_PATH", "")
+PREFERENCE_CACHE_PRUNE_SECONDS = float(os.getenv("PREFERENCE_CACHE_PRUNE_SECONDS", "3600"))
+
+# Everything except word characters, whitespace and "$" (which carries meaning in "under $100")
+_PUNCTUATION_RE = re.compile(r"[^\w\s$]")
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a message so trivially different phrasings share a cache key"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", message.lower()).split())
+
+
+class PreferenceCache:
+    """Two-tier cache of normalized message -> extracted preferences
+
+    The first tier is an in-memory LRU with a TTL. The optional second tier is
+    a SQLite table that survives restarts; hits there are promoted to memory.
+    Values are stored as JSON strings so callers always get a fresh copy.
+
+    Webhook worker processes share the SQLite file, so its queries run on a
+    single background thread (one connection, in WAL mode so readers don't
+    wait for a writer) instead of blocking the event loop. Expired rows are
+    deleted at most every PREFERENCE_CACHE_PRUNE_SECONDS.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PREFERENCE_CACHE_SIZE,
+        ttl_seconds: float = PREFERENCE_CACHE_TTL_SECONDS,
+        sqlite_path: str = PREFERENCE_CACHE_PATH
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_prune = 0.0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preference-cache")
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS preference_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS preference_cache_created_at ON preference_cache (created_at)")
+            self._db.commit()
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _read(self, key: str):
+        return self._db.execute(
+            "SELECT value, created_at FROM preference_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+    def _write(self, key: str, value: str, created_at: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO preference_cache (key, value, created_at) VALUES (?, ?, ?)",
+            (key, value, created_at)
+        )
+        if created_at - self._last_prune >= PREFERENCE_CACHE_PRUNE_SECONDS:
+            self._db.execute("DELETE FROM preference_cache WHERE created_at < ?", (created_at - self.ttl_seconds,))
+            self._last_prune = created_at
+        self._db.commit()
+
+    async def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """Return cached preferences for a message, or None on a miss"""
+        key = normalize_message(message)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if now - created_at < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(value)
+            del self._memory[key]
+
+        if self._db is not None:
+            row = await self._run(self._read, key)
+            if row is not None and now - row[1] < self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return json.loads(row[0])
+
+        self.misses += 1
+        return None
+
+    async def set(self, message: str, preferences: Dict[str, Any]) -> None:
+        """Cache the preferences extracted from a message"""
+        key = normalize_message(message)
+        value = json.dumps(preferences)
+        now = time.time()
+
+        self._remember(key, value, now)
+
+        if self._db is not None:
+            await self._run(self._write, key, value, now)
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for the cache"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._memory),
+            "memoryHits": self.memory_hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "hitRate": (self.memory_hits + self.disk_hits) / lookups if lookups else None,
+        }
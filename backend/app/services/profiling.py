@@ -0,0 +1,252 @@
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import monitoring
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Profiling settings; nothing is profiled unless a request asks or sampling is on
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # required by the header and /admin/profiles; unset turns both off
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOWEST_KEEP = int(os.getenv("PROFILE_SLOWEST_KEEP", "20"))
+PROFILE_RECENT_KEEP = int(os.getenv("PROFILE_RECENT_KEEP", "20"))
+PROFILE_JOBS = os.getenv("PROFILE_JOBS", "false").lower() == "true"
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "profiles")
+)
+
+# Lines of the pstats report kept in each profile summary
+_REPORT_LINES = 40
+
+
+class ProfileSession:
+    """One cProfile run plus the MongoDB commands that completed during it
+
+    Motor runs pymongo on executor threads, which cProfile doesn't see; the
+    awaiting coroutine just looks idle. Commands reported by the command
+    listener while the session is active are attributed to it instead.
+    cProfile traces the whole event loop thread, so other requests
+    interleaved with this one show up in the profile (and their Mongo
+    commands in the totals) too.
+    """
+
+    def __init__(self, kind: str, name: str, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.name = name
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.profiler = cProfile.Profile()
+        self.duration = 0.0
+        self.mongo_commands: Counter = Counter()
+        self.mongo_seconds: Counter = Counter()
+        self._lock = threading.Lock()
+        self._start_time = 0.0
+
+    def start(self) -> None:
+        self._start_time = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self._start_time
+
+    def record_mongo(self, command: str, seconds: float) -> None:
+        with self._lock:
+            self.mongo_commands[command] += 1
+            self.mongo_seconds[command] += seconds
+
+    def report(self) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(_REPORT_LINES)
+        return out.getvalue()
+
+    def dump(self) -> bytes:
+        """The profile in pstats format, loadable with pstats, snakeviz etc."""
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "trigger": self.trigger,
+            "startedAt": self.started_at.isoformat(),
+            "durationMs": self.duration * 1000,
+            "mongo": {
+                "commands": sum(self.mongo_commands.values()),
+                "totalMs": sum(self.mongo_seconds.values()) * 1000,
+                "byCommand": {
+                    command: {"count": count, "totalMs": self.mongo_seconds[command] * 1000}
+                    for command, count in self.mongo_commands.most_common()
+                },
+            },
+        }
+
+
+class ProfileStore:
+    """The most recent profiles and the slowest profiles seen, kept in memory"""
+
+    def __init__(self, slowest_keep: int = PROFILE_SLOWEST_KEEP, recent_keep: int = PROFILE_RECENT_KEEP):
+        self.slowest_keep = slowest_keep
+        self._recent: deque = deque(maxlen=recent_keep)
+        self._slowest: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, session: ProfileSession) -> Dict[str, Any]:
+        entry = {**session.summary(), "report": session.report(), "data": session.dump()}
+        with self._lock:
+            self._recent.append(entry)
+            self._slowest.append(entry)
+            self._slowest.sort(key=lambda item: item["durationMs"], reverse=True)
+            del self._slowest[self.slowest_keep:]
+        return entry
+
+    def list(self) -> Dict[str, List[Dict[str, Any]]]:
+        def brief(entry):
+            return {key: value for key, value in entry.items() if key not in ("report", "data")}
+
+        with self._lock:
+            return {
+                "slowest": [brief(entry) for entry in self._slowest],
+                "recent": [brief(entry) for entry in reversed(self._recent)],
+            }
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry in list(self._slowest) + list(self._recent):
+                if entry["id"] == profile_id:
+                    return entry
+        return None
+
+
+# One profile at a time per process: cProfile can't nest
+profile_store = ProfileStore()
+_active: Optional[ProfileSession] = None
+_active_lock = threading.Lock()
+
+
+def _begin(kind: str, name: str, trigger: str) -> Optional[ProfileSession]:
+    global _active
+    with _active_lock:
+        if _active is not None:
+            return None
+        _active = ProfileSession(kind, name, trigger)
+    _active.start()
+    return _active
+
+
+def _end(session: ProfileSession) -> Dict[str, Any]:
+    global _active
+    session.stop()
+    with _active_lock:
+        _active = None
+    return profile_store.add(session)
+
+
+class ProfileCommandListener(monitoring.CommandListener):
+    """Attribute MongoDB command time to the active profile"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        session = _active
+        if session is not None:
+            session.record_mongo(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        session = _active
+        if session is not None:
+            session.record_mongo(event.command_name, event.duration_micros / 1e6)
+
+
+profile_command_listener = ProfileCommandListener()
+
+
+def valid_profile_token(value: Optional[str]) -> bool:
+    """Whether value is the profile token; always False when PROFILE_TOKEN is unset"""
+    return bool(PROFILE_TOKEN) and value is not None and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+
+
+def _trigger(scope) -> Optional[str]:
+    """Why a request should be profiled, or None"""
+    header = PROFILE_HEADER.lower().encode()
+    for name, value in scope.get("headers", []):
+        if name == header:
+            if valid_profile_token(value.decode("latin-1")):
+                return "header"
+            break
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests asking for it, or a sample of all requests
+
+    A profiled response carries an X-Profile-Id header; the profile can be
+    fetched from /admin/profiles/{id}. While one request is being profiled,
+    others run unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        session = _begin("request", f"{scope.get('method')} {scope.get('path')}", trigger) if trigger else None
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _end(session)
+
+
+@contextmanager
+def profile_job(job: str) -> Iterator[Optional[ProfileSession]]:
+    """Profile a scheduler job run when PROFILE_JOBS is on, saving it under PROFILE_DIR"""
+    session = _begin("job", job, "job") if PROFILE_JOBS else None
+    try:
+        yield session
+    finally:
+        if session is not None:
+            entry = _end(session)
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{job}-{entry['startedAt'][:19].replace(':', '')}-{entry['id']}.prof")
+            with open(path, "wb") as f:
+                f.write(entry["data"])
+            logger.info(
+                f"Profiled {job} in {entry['durationMs']:.0f}ms "
+                f"({entry['mongo']['totalMs']:.0f}ms in {entry['mongo']['commands']} MongoDB commands): {path}"
+            )
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+
+def user_query(user_id: str) -> Dict[str, Any]:
+    """Build a users query from either an ObjectId or a telegramId string
+
+    Raises ValueError if the id is neither.
+    """
+    if ObjectId.is_valid(user_id):
+        return {"_id": ObjectId(user_id)}
+    return {"telegramId": int(user_id)}
+
+
+def to_api(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a MongoDB document to the dict shape used by the API models"""
+    document["id"] = str(document.pop("_id"))
+    return document
+
+
+async def insert_document(db, collection_name: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert a document and return it without reading it back"""
+    result = await db[collection_name].insert_one(document)
+    # insert_one already sets _id on the dict, but be explicit about it
+    document["_id"] = result.inserted_id
+    return document
+
+
+async def set_fields(
+    db,
+    collection_name: str,
+    query: Dict[str, Any],
+    fields: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Atomically $set fields on one document and return the updated document
+
+    Returns None if no document matches the query.
+    """
+    return await db[collection_name].find_one_and_update(
+        query,
+        {"$set": fields},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def delete_document(db, collection_name: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Atomically delete one document and return what was deleted
+
+    Returns None if no document matches the query.
+    """
+    return await db[collection_name].find_one_and_delete(query)
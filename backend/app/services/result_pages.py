@@ -0,0 +1,54 @@
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.models.event import Event
+
+# Load environment variables
+load_dotenv()
+
+# Result paging settings
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "5"))
+RESULTS_MAX_EVENTS = int(os.getenv("RESULTS_MAX_EVENTS", "20"))
+RESULT_PAGES_TTL_SECONDS = float(os.getenv("RESULT_PAGES_TTL_SECONDS", "900"))
+RESULT_PAGES_MAX_ENTRIES = int(os.getenv("RESULT_PAGES_MAX_ENTRIES", "10000"))
+
+
+class ResultPageCache:
+    """Short-lived store of search results, keyed by a token used in callback data
+
+    Paging through results reads from here instead of running the matching
+    query again. Tokens are short so "page:<token>:<n>" stays well within
+    Telegram's 64-byte callback data limit.
+    """
+
+    def __init__(self, ttl_seconds: float = RESULT_PAGES_TTL_SECONDS, max_entries: int = RESULT_PAGES_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def store(self, header: str, events: List[Event]) -> str:
+        """Store a result set and return its token"""
+        token = secrets.token_urlsafe(6)
+        self._entries[token] = ({"header": header, "events": events}, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a stored result set, or None if it expired or never existed"""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl_seconds:
+            del self._entries[token]
+            return None
+        return entry[0]
+
+
+def page_count(total: int, page_size: int = RESULTS_PAGE_SIZE) -> int:
+    return max((total + page_size - 1) // page_size, 1)
@@ -0,0 +1,221 @@
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Messages the rules understand at least this well skip the LLM entirely
+RULE_CONFIDENCE_THRESHOLD = float(os.getenv("RULE_CONFIDENCE_THRESHOLD", "0.8"))
+
+CITIES = [
+    "atlanta", "atlantic city", "new york", "new york city", "nyc", "brooklyn", "manhattan",
+    "san francisco", "los angeles", "chicago", "austin", "miami", "boston", "seattle",
+    "portland", "denver", "dallas", "houston", "san antonio", "san diego", "san jose",
+    "phoenix", "philadelphia", "washington", "washington dc", "baltimore", "pittsburgh",
+    "nashville", "memphis", "new orleans", "charlotte", "raleigh", "orlando", "tampa",
+    "jacksonville", "savannah", "charleston", "detroit", "minneapolis", "st louis",
+    "kansas city", "cleveland", "columbus", "cincinnati", "indianapolis", "milwaukee",
+    "las vegas", "salt lake city", "sacramento", "oakland", "honolulu", "anchorage",
+    "newark", "jersey city", "trenton", "princeton", "hoboken", "buffalo", "albany",
+    "providence", "hartford", "richmond", "virginia beach", "louisville", "birmingham",
+    "athens", "augusta", "macon", "decatur", "marietta", "alpharetta", "toronto",
+    "montreal", "vancouver", "mexico city", "london", "paris", "berlin", "madrid",
+    "barcelona", "rome", "amsterdam", "dublin", "lisbon", "tokyo", "sydney", "melbourne",
+]
+
+# Phrase -> canonical event type (the values used in the events collection)
+EVENT_TYPES = {
+    "music": "music", "concert": "music", "gig": "music", "live music": "music",
+    "dj set": "music", "rave": "music",
+    "festival": "festival", "fest": "festival",
+    "conference": "conference", "summit": "conference", "tech talk": "conference",
+    "convention": "convention", "con": "convention", "expo": "convention", "comic con": "convention",
+    "workshop": "workshop", "class": "workshop", "seminar": "workshop", "bootcamp": "workshop",
+    "sport": "sports", "sports": "sports", "game": "sports", "match": "sports", "race": "sports",
+    "marathon": "sports", "5k": "sports", "10k": "sports", "tournament": "sports",
+    "art": "art", "exhibition": "art", "exhibit": "art", "gallery": "art", "museum": "art",
+    "food": "food", "food truck": "food", "tasting": "food", "brunch": "food", "dinner": "food",
+    "theater": "theater", "theatre": "theater", "musical": "theater",
+    "broadway": "theater", "opera": "theater", "ballet": "theater",
+    "comedy": "comedy", "stand up": "comedy", "stand-up": "comedy", "improv": "comedy",
+    "outdoor": "outdoor", "outdoors": "outdoor", "hike": "outdoor", "hiking": "outdoor",
+    "airshow": "outdoor", "beach": "outdoor", "park": "outdoor",
+    "casino": "casino", "poker": "casino", "gambling": "casino", "blackjack": "casino",
+    "film": "film", "movie": "film", "cinema": "film", "screening": "film",
+    "networking": "networking", "meetup": "networking", "mixer": "networking",
+}
+
+KEYWORDS = [
+    "jazz", "rock", "pop", "hip hop", "rap", "edm", "techno", "house", "country", "blues",
+    "classical", "indie", "metal", "r&b", "soul", "reggae", "latin", "kpop",
+    "tech", "ai", "startup", "crypto", "blockchain", "data", "design", "marketing",
+    "food", "wine", "beer", "cocktails", "coffee", "vegan", "bbq",
+    "family", "kids", "art", "photography", "fashion", "dance", "yoga", "fitness",
+    "running", "cycling", "cosplay", "comics", "gaming", "esports", "anime", "scifi", "fantasy",
+    "books", "poetry", "history", "science", "charity", "pride",
+]
+
+# Recognized but not stored as preferences; they still count as understood text
+DATE_PHRASES = [
+    "today", "tonight", "tomorrow", "this weekend", "next weekend", "weekend",
+    "this week", "next week", "this month", "next month", "this year", "soon",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "summer", "winter", "spring", "fall",
+    "morning", "afternoon", "evening", "night",
+]
+
+# Phrase -> budget
+PRICE_WORDS = {
+    "free": {"max": 0}, "no cost": {"max": 0},
+    "cheap": {"max": 50}, "affordable": {"max": 50}, "budget": {"max": 50},
+    "inexpensive": {"max": 50}, "low cost": {"max": 50},
+}
+
+# Filler words that carry no preference; they are ignored when scoring confidence
+STOPWORDS = set("""
+a an the and or but of in on at to for from by with near around about into
+i im i'm me my we our us you your it its is are am be was were do does any
+some something anything events event things stuff happening going on what whats
+what's which where when who how find show tell give get looking look want wanna
+would like love interested into like please can could there here this that these
+those all more other just also really very good great fun cool best new nearby
+local area city town
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9$&'\-]+")
+_PRICE_RE = re.compile(
+    r"(?P<between>between\s+\$?(?P<lo>\d+(?:\.\d+)?)\s+(?:and|to|-)\s+\$?(?P<hi>\d+(?:\.\d+)?))"
+    r"|(?P<range>\$(?P<rlo>\d+(?:\.\d+)?)\s*-\s*\$?(?P<rhi>\d+(?:\.\d+)?))"
+    r"|(?P<under>(?:under|below|less\s+than|max(?:imum)?|up\s+to|cheaper\s+than)\s+\$?(?P<max>\d+(?:\.\d+)?)\s*(?:dollars|bucks)?)"
+    r"|(?P<over>(?:over|above|more\s+than|at\s+least|min(?:imum)?)\s+\$?(?P<min>\d+(?:\.\d+)?)\s*(?:dollars|bucks)?)"
+    r"|(?P<distance>within\s+(?P<dist>\d+)\s*(?:miles?|mi|km|kilometers?))"
+)
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    # Longest first so "atlantic city" wins over shorter overlapping phrases
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(re.escape(phrase) for phrase in ordered)
+
+
+class RuleExtractor:
+    """Gazetteer-based preference extractor compiled into a single regex
+
+    Every phrase list becomes one named group of a single alternation, so a
+    message is scanned once regardless of gazetteer size. The confidence is
+    the share of meaningful (non-filler) words covered by recognized phrases.
+    """
+
+    def __init__(self):
+        self.cities = {city: city.title() for city in CITIES}
+        self.event_types = dict(EVENT_TYPES)
+        self.keywords = set(KEYWORDS)
+        self._pattern: Optional[re.Pattern] = None
+        self.compile()
+
+    def compile(self) -> None:
+        """(Re)build the matcher from the current gazetteer"""
+        # Each phrase belongs to one group: city, then event type, price, date, keyword
+        types = set(self.event_types) - set(self.cities)
+        keywords = self.keywords - set(self.cities) - types - set(PRICE_WORDS) - set(DATE_PHRASES)
+        groups = [
+            ("city", self.cities),
+            ("type", types),
+            ("keyword", keywords),
+            ("price", PRICE_WORDS),
+            ("date", DATE_PHRASES),
+        ]
+        self._pattern = re.compile(
+            "|".join(
+                rf"(?P<{name}>\b(?:{_alternation(phrases)})(?:s|es)?\b)"
+                for name, phrases in groups
+            )
+        )
+
+    async def refresh_from_catalog(self, db) -> None:
+        """Add the event types and tags of the live event catalog to the gazetteer"""
+        for event_type in await db.events.distinct("type"):
+            if event_type:
+                self.event_types.setdefault(event_type.lower(), event_type)
+        for tag in await db.events.distinct("tags"):
+            if tag:
+                self.keywords.add(tag.lower())
+        self.compile()
+
+    def extract(self, user_message: str) -> Tuple[Dict[str, Any], float]:
+        """Extract preferences from a message and return them with a confidence score"""
+        message = user_message.lower()
+        preferences: Dict[str, Any] = {}
+        covered: List[Tuple[int, int]] = []
+        event_types: List[str] = []
+        keywords: List[str] = []
+
+        for match in _PRICE_RE.finditer(message):
+            covered.append(match.span())
+            if match.group("between"):
+                preferences["budget"] = {"min": float(match.group("lo")), "max": float(match.group("hi"))}
+            elif match.group("range"):
+                preferences["budget"] = {"min": float(match.group("rlo")), "max": float(match.group("rhi"))}
+            elif match.group("under"):
+                preferences.setdefault("budget", {})["max"] = float(match.group("max"))
+            elif match.group("over"):
+                preferences.setdefault("budget", {})["min"] = float(match.group("min"))
+            elif match.group("distance"):
+                preferences["maxDistance"] = int(match.group("dist"))
+
+        for match in self._pattern.finditer(message):
+            covered.append(match.span())
+            group = match.lastgroup
+            phrase = match.group(group)
+
+            if group == "city":
+                preferences.setdefault("location", self.cities[self._singular(phrase, self.cities)])
+            elif group == "type":
+                event_type = self.event_types[self._singular(phrase, self.event_types)]
+                if event_type not in event_types:
+                    event_types.append(event_type)
+            elif group == "keyword":
+                keyword = self._singular(phrase, self.keywords)
+                if keyword not in keywords:
+                    keywords.append(keyword)
+            elif group == "price" and "budget" not in preferences:
+                preferences["budget"] = dict(PRICE_WORDS[self._singular(phrase, PRICE_WORDS)])
+
+        if event_types:
+            preferences["eventTypes"] = event_types
+        if keywords:
+            preferences["keywords"] = keywords
+
+        if not preferences:
+            return preferences, 0.0
+
+        # Confidence: share of meaningful words that a recognized phrase covers
+        content_words = 0
+        covered_words = 0
+        for token in _TOKEN_RE.finditer(message):
+            if token.group() in STOPWORDS:
+                continue
+            content_words += 1
+            start, end = token.span()
+            if any(lo <= start and end <= hi for lo, hi in covered):
+                covered_words += 1
+
+        confidence = covered_words / content_words if content_words else 1.0
+        return preferences, confidence
+
+    @staticmethod
+    def _singular(phrase: str, known) -> str:
+        """Map a matched (possibly plural) phrase back to its gazetteer entry"""
+        if phrase in known:
+            return phrase
+        if phrase.endswith("es") and phrase[:-2] in known:
+            return phrase[:-2]
+        return phrase[:-1]
+
+
+# Shared by every caller in the process
+rule_extractor = RuleExtractor()
@@ -0,0 +1,31 @@
+import time
+from typing import Optional, Tuple
+
+from telegram.request import HTTPXRequest, RequestData
+
+from app.services.metrics import TELEGRAM_RATE_LIMITED, TELEGRAM_REQUEST_DURATION
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API call latency and 429 responses"""
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        *args,
+        **kwargs
+    ) -> Tuple[int, bytes]:
+        # .../bot<token>/sendMessage -> sendMessage
+        api_method = url.rsplit("/", 1)[-1]
+        outcome = "error"
+        start_time = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+            outcome = "ok" if code == 200 else str(code)
+            if code == 429:
+                TELEGRAM_RATE_LIMITED.labels(api_method).inc()
+            return code, payload
+        finally:
+            TELEGRAM_REQUEST_DURATION.labels(api_method, outcome).observe(time.perf_counter() - start_time)
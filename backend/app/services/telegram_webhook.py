@@ -0,0 +1,186 @@
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, List
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Webhook settings
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL registered with Telegram, if any
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # also required by /stats, which is off without it
+
+# Handler group for the processed-updates counter; runs after the bot's handlers
+_COUNTER_GROUP = 1000
+
+# Update fields that carry a chat, and those that only carry a sender
+_CHAT_FIELDS = ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member",
+                "chat_member", "chat_join_request")
+_SENDER_FIELDS = ("inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query",
+                  "poll_answer")
+
+
+def chat_key(payload: Dict[str, Any]) -> int:
+    """The id that determines ordering for an update: its chat, else its sender"""
+    for field in _CHAT_FIELDS:
+        if field in payload:
+            return payload[field]["chat"]["id"]
+
+    if "callback_query" in payload:
+        callback_query = payload["callback_query"]
+        if callback_query.get("message"):
+            return callback_query["message"]["chat"]["id"]
+        return callback_query["from"]["id"]
+
+    for field in _SENDER_FIELDS:
+        sender = payload.get(field, {}).get("from") or payload.get(field, {}).get("user")
+        if sender:
+            return sender["id"]
+
+    return payload.get("update_id", 0)
+
+
+def route(payload: Dict[str, Any], workers: int) -> int:
+    """Pick the worker for an update; a chat always maps to the same worker"""
+    return chat_key(payload) % workers
+
+
+def _worker_main(index: int, queue, processed, build_application: Callable) -> None:
+    logging.basicConfig(
+        format=f"%(asctime)s - worker {index} - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    try:
+        asyncio.run(_run_worker(index, queue, processed, build_application))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(index: int, queue, processed, build_application: Callable) -> None:
+    """Feed updates from this worker's queue into its own Application"""
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    from app.services.metrics import BOT_METRICS_PORT, serve_metrics
+
+    # Each worker process has its own metrics, on consecutive ports
+    if BOT_METRICS_PORT:
+        serve_metrics(BOT_METRICS_PORT + index)
+
+    application = build_application(webhook=True)
+
+    async def count_processed(update, context) -> None:
+        with processed.get_lock():
+            processed.value += 1
+
+    application.add_handler(TypeHandler(Update, count_processed), group=_COUNTER_GROUP)
+
+    async with application:
+        # initialize() doesn't run post_init; only run_polling/run_webhook do
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        logger.info(f"Webhook worker {index} started")
+
+        loop = asyncio.get_running_loop()
+        while True:
+            payload = await loop.run_in_executor(None, queue.get)
+            if payload is None:
+                break
+            await application.update_queue.put(Update.de_json(payload, application.bot))
+
+        await application.stop()
+
+
+def _has_secret(request) -> bool:
+    """Whether the request carries WEBHOOK_SECRET in Telegram's secret token header"""
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    return hmac.compare_digest(token.encode(), WEBHOOK_SECRET.encode())
+
+
+def create_webhook_app(queues: List, processed: List):
+    """ASGI app that accepts Telegram updates and routes them to worker queues"""
+    from fastapi import FastAPI, HTTPException, Request
+
+    app = FastAPI(title="Event Assistant Bot Webhook")
+    app.state.received = 0
+
+    @app.post(WEBHOOK_PATH)
+    async def receive_update(request: Request):
+        if WEBHOOK_SECRET and not _has_secret(request):
+            raise HTTPException(status_code=403, detail="Invalid secret token")
+
+        payload = await request.json()
+        queues[route(payload, len(queues))].put(payload)
+        app.state.received += 1
+        return {"ok": True}
+
+    @app.get("/stats")
+    async def webhook_stats(request: Request):
+        # This listener is public; queue internals are only for holders of the secret
+        if not WEBHOOK_SECRET or not _has_secret(request):
+            raise HTTPException(status_code=403, detail="Invalid secret token")
+
+        return {
+            "workers": len(queues),
+            "received": app.state.received,
+            "processed": [counter.value for counter in processed],
+        }
+
+    return app
+
+
+async def _register_webhook(application) -> None:
+    from telegram import Update
+
+    async with application.bot as bot:
+        await bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=100
+        )
+    logger.info(f"Webhook registered at {WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH}")
+
+
+def run_webhook(build_application: Callable, workers: int = WEBHOOK_WORKERS) -> None:
+    """Serve the webhook and process updates in worker processes
+
+    Each worker runs its own Application. Updates are routed by chat id, so
+    one chat's updates always go to the same worker, in arrival order, while
+    different chats are processed on different cores.
+    build_application(webhook=True) must return an Application without an updater.
+    """
+    import uvicorn
+
+    # spawn, not fork: workers must open their own MongoDB and HTTP connections
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue() for _ in range(workers)]
+    processed = [context.Value("q", 0) for _ in range(workers)]
+    processes = [
+        context.Process(target=_worker_main, args=(i, queues[i], processed[i], build_application), daemon=True)
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    if WEBHOOK_URL:
+        asyncio.run(_register_webhook(build_application(webhook=True)))
+
+    try:
+        uvicorn.run(create_webhook_app(queues, processed), host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join(timeout=10)
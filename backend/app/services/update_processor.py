@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, Optional
+
+from dotenv import load_dotenv
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from app.services.message_debouncer import MessageDebouncer
+from app.services.metrics import (
+    TELEGRAM_UPDATE_WAIT,
+    TELEGRAM_UPDATES_DROPPED,
+    TELEGRAM_UPDATES_IN_FLIGHT,
+    TELEGRAM_UPDATES_WAITING,
+)
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Update processing settings
+UPDATE_MAX_CONCURRENCY = int(os.getenv("UPDATE_MAX_CONCURRENCY", "32"))
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "1000"))
+UPDATE_COALESCE_DEPTH = int(os.getenv("UPDATE_COALESCE_DEPTH", "100"))
+UPDATE_STATS_INTERVAL_SECONDS = float(os.getenv("UPDATE_STATS_INTERVAL_SECONDS", "60"))
+
+
+def _chat_key(update: object) -> Optional[int]:
+    """The chat (or, without a chat, the user) whose updates must stay ordered"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+def _is_supersedable(update: object) -> bool:
+    """Plain text messages can be replaced by a newer one; commands and buttons cannot"""
+    return (
+        isinstance(update, Update)
+        and update.message is not None
+        and bool(update.message.text)
+        and not update.message.text.startswith("/")
+    )
+
+
+class _ChatState:
+    __slots__ = ("lock", "waiting", "latest_text", "epoch", "latest_epoch")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+        self.latest_text = 0  # update_id of the newest text message seen
+        self.epoch = 0  # bumped by every other update, which text can't be merged across
+        self.latest_epoch = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from different chats concurrently, each chat in order
+
+    A per-chat lock keeps one chat's updates sequential; the global slot
+    (max_concurrent_updates) is only taken once an update is next in its
+    chat, so a chat waiting on a slow LLM call never holds a slot another
+    chat could use. Under load, text messages are coalesced and shed:
+
+    - when more than coalesce_depth updates are waiting, a text message that
+      a newer text message from the same chat has superseded is dropped;
+    - when max_pending updates are already accepted, new text messages are
+      dropped. Commands and button presses are always processed.
+
+    With a debouncer, text messages are registered with it on arrival and
+    wait for their burst to complete before taking a global slot.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_updates: int = UPDATE_MAX_CONCURRENCY,
+        max_pending: int = UPDATE_MAX_PENDING,
+        coalesce_depth: int = UPDATE_COALESCE_DEPTH,
+        stats_interval: float = UPDATE_STATS_INTERVAL_SECONDS,
+        debouncer: Optional[MessageDebouncer] = None
+    ):
+        super().__init__(max_concurrent_updates)
+        # Our own global slots; the base class's semaphore is private and process_update replaces its only use
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self.debouncer = debouncer
+        self.max_pending = max_pending
+        self.coalesce_depth = coalesce_depth
+        self.stats_interval = stats_interval
+        self._chats: Dict[int, _ChatState] = {}
+        self._stats_task: Optional[asyncio.Task] = None
+        self._wait_times: deque = deque(maxlen=1000)
+        self.pending = 0  # accepted and not finished
+        self.waiting = 0  # accepted and not started
+        self.in_flight = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.shed = 0
+        self.max_wait = 0.0
+
+    async def initialize(self) -> None:
+        if self.stats_interval > 0:
+            self._stats_task = asyncio.create_task(self._log_stats())
+
+    async def shutdown(self) -> None:
+        if self._stats_task:
+            self._stats_task.cancel()
+            self._stats_task = None
+
+    async def do_process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        await coroutine
+
+    # BaseUpdateProcessor.process_update is marked @final in python-telegram-bot 20.5 (pinned in
+    # requirements.txt): it takes a global slot and then calls do_process_update, so a chat waiting
+    # for its earlier updates would sit on a slot. Ordering has to happen before the slot is taken,
+    # which do_process_update can't do, hence the override. @final is only a type-checker hint;
+    # Application calls process_update unchanged. Re-check this when upgrading the library.
+    async def process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:  # type: ignore[misc]
+        supersedable = _is_supersedable(update)
+        if supersedable and self.pending >= self.max_pending:
+            self.shed += 1
+            TELEGRAM_UPDATES_DROPPED.labels("shed").inc()
+            coroutine.close()
+            return
+
+        key = _chat_key(update)
+        arrived = time.monotonic()
+        started = False
+        self.pending += 1
+        self.waiting += 1
+        TELEGRAM_UPDATES_WAITING.inc()
+
+        state = None
+        epoch = 0
+        if key is not None:
+            state = self._chats.get(key)
+            if state is None:
+                state = self._chats[key] = _ChatState()
+            state.waiting += 1
+            if supersedable:
+                state.latest_text = update.update_id
+                state.latest_epoch = epoch = state.epoch
+            else:
+                state.epoch += 1
+
+            if self.debouncer:
+                if supersedable:
+                    self.debouncer.add(key, update.update_id, update.message.text)
+                else:
+                    self.debouncer.close(key)
+
+        try:
+            if state is None:
+                async with self._slots:
+                    started = self._start(arrived)
+                    await self.do_process_update(update, coroutine)
+                return
+
+            async with state.lock:
+                superseded = (
+                    supersedable
+                    and state.latest_text != update.update_id
+                    and state.latest_epoch == epoch
+                )
+                if superseded and self.waiting > self.coalesce_depth:
+                    self.coalesced += 1
+                    TELEGRAM_UPDATES_DROPPED.labels("coalesced").inc()
+                    if self.debouncer:
+                        # The newer message still picks up this text from the burst
+                        self.debouncer.forget(key, update.update_id)
+                    coroutine.close()
+                    return
+
+                if supersedable and self.debouncer:
+                    await self.debouncer.wait_quiet(key, update.update_id)
+
+                async with self._slots:
+                    started = self._start(arrived)
+                    await self.do_process_update(update, coroutine)
+        finally:
+            self.pending -= 1
+            if started:
+                self.in_flight -= 1
+                self.processed += 1
+                TELEGRAM_UPDATES_IN_FLIGHT.dec()
+            else:
+                self.waiting -= 1
+                TELEGRAM_UPDATES_WAITING.dec()
+            if state is not None:
+                state.waiting -= 1
+                if state.waiting == 0:
+                    self._chats.pop(key, None)
+
+    def _start(self, arrived: float) -> bool:
+        wait = time.monotonic() - arrived
+        self._wait_times.append(wait)
+        self.max_wait = max(self.max_wait, wait)
+        self.waiting -= 1
+        self.in_flight += 1
+        TELEGRAM_UPDATE_WAIT.observe(wait)
+        TELEGRAM_UPDATES_WAITING.dec()
+        TELEGRAM_UPDATES_IN_FLIGHT.inc()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        stats = {
+            "queueDepth": self.waiting,
+            "inFlight": self.in_flight,
+            "activeChats": len(self._chats),
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "shed": self.shed,
+            "waitP50Ms": waits[len(waits) // 2] * 1000 if waits else None,
+            "waitP95Ms": waits[int(len(waits) * 0.95)] * 1000 if waits else None,
+            "waitMaxMs": self.max_wait * 1000,
+        }
+        if self.debouncer:
+            stats["debounce"] = self.debouncer.stats()
+        return stats
+
+    async def _log_stats(self) -> None:
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logger.info(f"Update processor: {self.stats()}")
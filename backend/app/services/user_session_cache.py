@@ -0,0 +1,76 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Session cache settings
+USER_SESSION_CACHE_SIZE = int(os.getenv("USER_SESSION_CACHE_SIZE", "10000"))
+USER_SESSION_IDLE_SECONDS = float(os.getenv("USER_SESSION_IDLE_SECONDS", "600"))
+# Bounds how long changes made elsewhere (the API, another bot worker) go unseen
+USER_SESSION_MAX_AGE_SECONDS = float(os.getenv("USER_SESSION_MAX_AGE_SECONDS", "60"))
+
+
+class UserSessionCache:
+    """Size-bounded cache of user documents keyed by telegramId
+
+    Entries expire after USER_SESSION_IDLE_SECONDS without access, or
+    USER_SESSION_MAX_AGE_SECONDS after they were stored however often they
+    are read, and the least recently used entry is evicted when the cache is
+    full. Writers put the document returned by their find_one_and_update
+    back into the cache, so an active chat re-reads its user at most once
+    per max age, and picks up API edits and deletes within that time.
+    """
+
+    def __init__(
+        self,
+        max_size: int = USER_SESSION_CACHE_SIZE,
+        idle_seconds: float = USER_SESSION_IDLE_SECONDS,
+        max_age_seconds: float = USER_SESSION_MAX_AGE_SECONDS
+    ):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.max_age_seconds = max_age_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Return the cached user document, or None if missing, idle too long or too old"""
+        entry = self._entries.get(telegram_id)
+        now = time.monotonic()
+
+        if entry is None or now - entry[1] > self.idle_seconds or now - entry[2] > self.max_age_seconds:
+            if entry is not None:
+                del self._entries[telegram_id]
+            self.misses += 1
+            return None
+
+        self._entries[telegram_id] = (entry[0], now, entry[2])
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, telegram_id: int, user_doc: Dict[str, Any]) -> None:
+        """Store the latest version of a user document"""
+        now = time.monotonic()
+        self._entries[telegram_id] = (user_doc, now, now)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else None,
+        }
@@ -0,0 +1,249 @@
+"""Replay Telegram updates through the bot's handlers against a fake Bot API.
+
+Each simulated chat replays the recorded conversation in
+fixtures/telegram_updates.json (/start, free text, /events, /preferences,
+a frequency button...). The recorded free text is all handled by the rule
+extractor, so --novel-text-ratio of the text messages are swapped for
+phrasings the rules can't handle (and the preference cache hasn't seen),
+which go to the LLM. Updates are fed to the bot's Application at a fixed
+rate, the same way webhook mode feeds them, so they go through the real
+update processor, debouncer and handlers. Every Bot API call the handlers
+make goes to the in-process fake server, which records it. The LLM is a
+stub with a fixed latency.
+
+Reports handler and end-to-end latency percentiles (overall and per
+update kind), throughput, and MongoDB operations, LLM calls and Bot API
+calls per update.
+
+Run from the backend directory:
+    python benchmarks/bench_bot.py --updates 2000 --chats 200 --rate 200
+    python benchmarks/bench_bot.py --mongo-uri mongodb://localhost:27017 --rate 0 --output bot.json
+
+--rate 0 sends everything at once to find the saturation throughput.
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from common import (
+    BACKEND_DIR,
+    EXTRACTION_MESSAGES,
+    FakeTelegramServer,
+    configure_environment,
+    install_stub_llm,
+    open_database,
+    percentiles,
+    run_metadata,
+    seed_database,
+    write_results,
+)
+from updates import FIXTURES_PATH, load_updates, mix_in_text, update_stream
+
+
+class CountingCollection:
+    """Collection proxy counting the operations called on it"""
+
+    def __init__(self, collection, counts: Counter):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counts[f"{self._collection.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class CountingDatabase:
+    """Database proxy whose collections count operations; works the same on mongod and mongomock"""
+
+    def __init__(self, db):
+        self._db = db
+        self.counts: Counter = Counter()
+
+    def __getattr__(self, name: str):
+        return self[name]
+
+    def __getitem__(self, name: str) -> CountingCollection:
+        return CountingCollection(self._db[name], self.counts)
+
+
+def load_bot_module():
+    """Import telegram/bot.py under another name; `telegram` is python-telegram-bot"""
+    spec = importlib.util.spec_from_file_location("event_bot", os.path.join(BACKEND_DIR, "telegram", "bot.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rule_misses() -> List[str]:
+    """The extraction messages the rule extractor isn't confident about"""
+    from app.services.rule_extractor import RULE_CONFIDENCE_THRESHOLD, rule_extractor
+
+    return [message for message in EXTRACTION_MESSAGES if rule_extractor.extract(message)[1] < RULE_CONFIDENCE_THRESHOLD]
+
+
+def update_kind(update: Dict[str, Any]) -> str:
+    if "callback_query" in update:
+        return "callback:" + update["callback_query"]["data"].split("_")[0]
+    text = update.get("message", {}).get("text", "")
+    if text.startswith("/"):
+        return text.split()[0]
+    return "text"
+
+
+async def main_async(args) -> Dict[str, Any]:
+    db = open_database(args.mongo_uri, args.database)
+    await seed_database(db, args.events, args.users, seed=args.seed)
+    stub = install_stub_llm(args.llm_latency_ms)
+
+    with FakeTelegramServer(latency_ms=args.telegram_latency_ms) as telegram:
+        os.environ["TELEGRAM_API_BASE_URL"] = telegram.base_url
+        bot = load_bot_module()
+        # One INFO line per Bot API call would drown the output
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        counting_db = CountingDatabase(db)
+        bot.db = counting_db
+        application = bot.build_application(webhook=True)
+        processor = application.update_processor
+
+        templates = load_updates(args.fixtures)
+        updates = list(update_stream(templates, args.chats, args.updates))
+        novel = mix_in_text(updates, rule_misses(), args.novel_text_ratio, seed=args.seed)
+        kinds = {
+            update["update_id"]: "text:novel" if update["update_id"] in novel else update_kind(update)
+            for update in updates
+        }
+        enqueued_at: Dict[int, float] = {}
+        handler_latency: Dict[str, List[float]] = defaultdict(list)
+        end_to_end_latency: Dict[str, List[float]] = defaultdict(list)
+        errors = 0
+        done = asyncio.Event()
+
+        # Time each update from the moment its handlers start, and from when it was fed in
+        process_update = application.process_update
+
+        async def timed_process_update(update):
+            nonlocal errors
+            start_time = time.perf_counter()
+            try:
+                await process_update(update)
+            except Exception:
+                errors += 1
+                raise
+            finally:
+                finished = time.perf_counter()
+                kind = kinds[update.update_id]
+                handler_latency[kind].append(finished - start_time)
+                end_to_end_latency[kind].append(finished - enqueued_at[update.update_id])
+                if handled() >= len(updates):
+                    done.set()
+
+        def handled() -> int:
+            # Coalesced and shed updates never reach the handlers
+            return sum(map(len, handler_latency.values())) + processor.coalesced + processor.shed
+
+        application.process_update = timed_process_update
+
+        async with application:
+            await bot.post_init(application)
+            await application.start()
+            counting_db.counts.clear()
+            calls_before = Counter(telegram.state.calls)
+            llm_calls_before = stub.calls
+
+            start_time = time.perf_counter()
+            for i, data in enumerate(updates):
+                if args.rate:
+                    delay = start_time + i / args.rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                enqueued_at[data["update_id"]] = time.perf_counter()
+                await application.update_queue.put(bot.Update.de_json(data, application.bot))
+            sent_seconds = time.perf_counter() - start_time
+
+            try:
+                await asyncio.wait_for(done.wait(), timeout=args.timeout)
+            except asyncio.TimeoutError:
+                print(f"Timed out with {handled()}/{len(updates)} updates handled")
+            elapsed = time.perf_counter() - start_time
+            processor_stats = processor.stats()
+            await application.stop()
+
+        bot_api_calls = Counter(telegram.state.calls) - calls_before
+
+    count = len(updates)
+    all_handler = [value for values in handler_latency.values() for value in values]
+    all_end_to_end = [value for values in end_to_end_latency.values() for value in values]
+    return {
+        "meta": run_metadata(args.mongo_uri),
+        "config": vars(args),
+        "updates": count,
+        "novelTextUpdates": len(novel),
+        "handled": len(all_handler),
+        "errors": errors,
+        "sendSeconds": sent_seconds,
+        "elapsedSeconds": elapsed,
+        "updatesPerSecond": len(all_handler) / elapsed,
+        "handlerLatency": percentiles(all_handler),
+        "endToEndLatency": percentiles(all_end_to_end),
+        "byKind": {
+            kind: {
+                "handler": percentiles(handler_latency[kind]),
+                "endToEnd": percentiles(end_to_end_latency[kind]),
+            }
+            for kind in sorted(handler_latency)
+        },
+        "perUpdate": {
+            "mongoOperations": sum(counting_db.counts.values()) / count,
+            "llmCalls": (stub.calls - llm_calls_before) / count,
+            "botApiCalls": sum(bot_api_calls.values()) / count,
+        },
+        "mongoOperations": dict(counting_db.counts.most_common()),
+        "botApiCalls": dict(bot_api_calls.most_common()),
+        "processor": processor_stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-uri", default="", help="local mongod; in-memory stand-in if omitted")
+    parser.add_argument("--database", default="event_assistant_bench", help="dropped and reseeded")
+    parser.add_argument("--events", type=int, default=1000, help="events seeded")
+    parser.add_argument("--users", type=int, default=0, help="existing users seeded, besides the simulated chats")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=100, help="updates per second; 0 sends all at once")
+    parser.add_argument(
+        "--novel-text-ratio", type=float, default=0.5,
+        help="share of text messages replaced with phrasings only the LLM handles"
+    )
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="stub LLM latency")
+    parser.add_argument("--telegram-latency-ms", type=float, default=0.0, help="added to every fake Bot API call")
+    parser.add_argument("--debounce-ms", type=float, help="override MESSAGE_DEBOUNCE_MS")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the handlers to finish")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    # Must happen before any app module is imported
+    configure_environment(args.mongo_uri, args.database)
+    if args.debounce_ms is not None:
+        os.environ["MESSAGE_DEBOUNCE_MS"] = str(args.debounce_ms)
+    write_results(asyncio.run(main_async(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark top-k semantic search over a memory-mapped event embedding matrix.
+
+Random normalized vectors stand in for real embeddings (search cost only
+depends on the matrix shape), so no model download is needed. Reports index
+build time, cold memory-map load time, search latency percentiles and the
+cost of incremental updates, and fails if p95 search latency exceeds the
+budget.
+
+Run from the backend directory:
+    python benchmarks/bench_embedding_search.py --events 500000 --budget-ms 100
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import percentiles, write_results
+from app.services.embedding_index import EventEmbeddingIndex
+
+
+def random_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 produces 384")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--budget-ms", type=float, default=100, help="maximum allowed p95 search latency")
+    parser.add_argument("--index-dir", help="defaults to a temporary directory")
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="event-embeddings-")
+    ids = [f"{i:024x}" for i in range(args.events)]
+
+    # Build the index in chunks, as rebuild_index does
+    index = EventEmbeddingIndex(index_dir=index_dir)
+    start_time = time.perf_counter()
+    for offset in range(0, args.events, 50_000):
+        chunk = ids[offset:offset + 50_000]
+        index.add_vectors(chunk, random_vectors(rng, len(chunk), args.dim))
+    build_seconds = time.perf_counter() - start_time
+
+    # A fresh process only pays for mapping the files and reading the id column
+    start_time = time.perf_counter()
+    reader = EventEmbeddingIndex(index_dir=index_dir)
+    reader.load()
+    load_seconds = time.perf_counter() - start_time
+
+    queries = random_vectors(rng, args.queries, args.dim)
+    reader.search_vector(queries[0], args.k)  # fault the pages in
+    latencies = []
+    for query in queries:
+        start_time = time.perf_counter()
+        reader.search_vector(query, args.k)
+        latencies.append(time.perf_counter() - start_time)
+
+    # Incremental updates: overwrite existing rows and append new ones
+    start_time = time.perf_counter()
+    for i in range(args.updates):
+        event_id = ids[i] if i % 2 == 0 else f"{args.events + i:024x}"
+        index.add_vectors([event_id], random_vectors(rng, 1, args.dim))
+    update_ms = (time.perf_counter() - start_time) / args.updates * 1000
+
+    search = percentiles(latencies)
+    results = {
+        "config": vars(args),
+        "buildSeconds": build_seconds,
+        "loadSeconds": load_seconds,
+        "search": search,
+        "updateMs": update_ms,
+        "withinBudget": search["p95Ms"] <= args.budget_ms,
+    }
+    write_results(results, args.output)
+
+    if not results["withinBudget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
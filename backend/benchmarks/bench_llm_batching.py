@@ -0,0 +1,113 @@
+"""Benchmark micro-batched preference extraction against a local stub model server.
+
+The stub serves an OpenAI-compatible /v1/completions endpoint and processes
+one request at a time (like a single GPU), taking
+base_ms + per_item_ms * batch_size per request. Messages arrive as a Poisson
+stream, and each one is sent either on its own or through PreferenceBatcher.
+
+Run from the backend directory:
+    python benchmarks/bench_llm_batching.py --messages 500 --rate 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+from common import percentiles, write_results
+from app.services.llm_batcher import PreferenceBatcher, completions_backend
+
+STUB_COMPLETION = '{"eventTypes": ["music"], "location": "Atlanta", "keywords": ["jazz"]}'
+
+
+def create_stub_server(base_ms: float, per_item_ms: float) -> FastAPI:
+    """Create a stub completions server with a fixed per-call and per-item cost"""
+    stub = FastAPI()
+    gpu = asyncio.Lock()
+
+    @stub.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+        async with gpu:
+            await asyncio.sleep((base_ms + per_item_ms * len(prompts)) / 1000)
+        return {"choices": [{"index": i, "text": STUB_COMPLETION} for i in range(len(prompts))]}
+
+    return stub
+
+
+async def run_scenario(send, messages: int, rate: float, seed: int):
+    """Send a Poisson stream of messages and collect per-message latency"""
+    rng = random.Random(seed)
+    latencies = []
+
+    async def one(i: int):
+        start_time = time.perf_counter()
+        await send(f"jazz concerts in Atlanta #{i}")
+        latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    tasks = []
+    for i in range(messages):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start_time
+
+    return {**percentiles(latencies), "throughput": messages / elapsed}
+
+
+async def main_async(args) -> dict:
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_server(args.base_ms, args.per_item_ms),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    url = f"http://127.0.0.1:{args.port}/v1/completions"
+    results = {"config": vars(args)}
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=1000)) as client:
+        backend = completions_backend(url, "stub", client)
+
+        async def unbatched(prompt: str):
+            return (await backend([prompt]))[0]
+
+        results["unbatched"] = await run_scenario(unbatched, args.messages, args.rate, args.seed)
+
+        for wait_ms in args.wait_ms:
+            batcher = PreferenceBatcher(backend, max_batch_size=args.batch_size, max_wait_ms=wait_ms)
+            scenario = await run_scenario(batcher.submit, args.messages, args.rate, args.seed)
+            scenario.update(batcher.stats())
+            results[f"batched_wait_{wait_ms:g}ms"] = scenario
+
+    server.should_exit = True
+    await server_task
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="arrivals per second")
+    parser.add_argument("--base-ms", type=float, default=40, help="stub cost per model call")
+    parser.add_argument("--per-item-ms", type=float, default=2, help="stub cost per prompt in a call")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[2, 5, 10, 20])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    write_results(asyncio.run(main_async(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark vectorized event ranking against filtering and scoring events one by one in Python.
+
+Generates a pool of upcoming event documents like the one event_service's
+EventPool holds, builds its EventColumns once (timed and reported
+separately, since a pool serves every query until it is rebuilt), then for
+each query runs the per-query path of rank_events: hard filters as NumPy
+masks, scoring of the matching rows and top_k. The reference is a
+per-event Python loop applying the same filters and formula to the
+documents. Checks both pick the same events, reports latency percentiles
+and the speedup, and fails if the speedup is below --min-speedup.
+
+Run from the backend directory:
+    python benchmarks/bench_ranking.py --events 10000 --queries 200
+"""
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+from common import CITIES, EVENT_TYPES, TAGS, configure_environment, percentiles, random_preferences, write_results
+
+
+def pool_documents(rng: random.Random, n: int, now: datetime) -> List[Dict[str, Any]]:
+    """Upcoming events, soonest first, projected to the fields ranking reads"""
+    documents = []
+    for i in range(n):
+        tags = rng.sample(TAGS, rng.randint(1, 4))
+        event_type = rng.choice(EVENT_TYPES)
+        city = rng.choice(CITIES)
+        documents.append({
+            "_id": i,
+            "type": event_type,
+            "tags": tags,
+            "title": f"{tags[0].title()} {event_type} in {city} #{i}",
+            "location": city,
+            "price": None if rng.random() < 0.1 else float(rng.choice([0, 10, 25, 40, 75, 120, 300])),
+            # Some start just after now, so later queries see them as past
+            "startDate": now + timedelta(seconds=rng.uniform(1, 180 * 86400)),
+        })
+    documents.sort(key=lambda doc: doc["startDate"])
+    return documents
+
+
+def rank_loop(documents: Sequence[Dict[str, Any]], preferences, now: datetime, k: int) -> List[Any]:
+    """The same filters and formula as event_ranking, one event at a time"""
+    from app.services.event_ranking import RANKING_TIME_DECAY_DAYS, RANKING_WEIGHTS
+
+    budget = preferences.budget or {}
+    budget_min, budget_max = budget.get("min"), budget.get("max")
+    location = preferences.location.lower() if preferences.location else None
+    keywords = preferences.keywords or []
+    event_types = preferences.eventTypes or []
+    now_ts = now.timestamp()
+
+    scored: List[Tuple[float, int, Any]] = []
+    for position, doc in enumerate(documents):
+        start = doc["startDate"].timestamp()
+        if start < now_ts:
+            continue
+        event_location = doc["location"].lower()
+        if location and location not in event_location:
+            continue
+        price = doc["price"]
+        if budget_min is not None and (price is None or price < budget_min):
+            continue
+        if budget_max is not None and (price is None or price > budget_max):
+            continue
+
+        type_match = doc["type"] in event_types
+        title = doc["title"].lower()
+        matched = sum(1 for keyword in keywords if keyword in doc["tags"] or keyword.lower() in title)
+        if (event_types or keywords) and not type_match and not matched:
+            continue
+
+        score = 0.0
+        if event_types:
+            score += RANKING_WEIGHTS["type"] * type_match
+        if keywords:
+            score += RANKING_WEIGHTS["keywords"] * matched / len(keywords)
+        if location:
+            score += RANKING_WEIGHTS["location"] * (1.0 if event_location == location else 0.5)
+        if budget_max is not None:
+            if price is None:
+                fit = 0.5
+            elif budget_max > 0:
+                fit = 1.0 - 0.5 * min(max(price / budget_max, 0.0), 1.0)
+            else:
+                fit = 1.0 if price == 0 else 0.0
+            score += RANKING_WEIGHTS["price"] * fit
+        days_away = max(start - now_ts, 0.0) / 86400
+        score += RANKING_WEIGHTS["time"] * math.pow(2.0, -days_away / RANKING_TIME_DECAY_DAYS)
+        scored.append((score, -position, doc["_id"]))
+
+    return [event_id for _, _, event_id in heapq.nlargest(k, scored)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000, help="upcoming events in the pool")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-speedup", type=float, default=10.0, help="required loop/vectorized time ratio per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    configure_environment()
+    import numpy as np
+    from app.models.user import UserPreferences
+    from app.services.event_ranking import EventColumns, candidate_mask, match_signals, score_events, top_k
+
+    rng = random.Random(args.seed)
+    built_at = datetime.utcnow()
+    documents = pool_documents(rng, args.events, built_at)
+    queries = [UserPreferences(**random_preferences(rng)) for _ in range(args.queries)]
+
+    start_time = time.perf_counter()
+    columns = EventColumns(documents)
+    build_seconds = time.perf_counter() - start_time
+
+    vectorized, loop = [], []
+    mismatches = 0
+    for preferences in queries:
+        now = datetime.utcnow()
+
+        start_time = time.perf_counter()
+        signals = match_signals(columns, preferences)
+        rows = np.flatnonzero(candidate_mask(columns, preferences, now, signals))
+        scores = score_events(columns, preferences, now, signals=signals, rows=rows)
+        best = [columns.ids[rows[i]] for i in top_k(scores, args.k)]
+        vectorized.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        reference = rank_loop(documents, preferences, now, args.k)
+        loop.append(time.perf_counter() - start_time)
+
+        mismatches += best != reference
+
+    speedup = sum(loop) / sum(vectorized)
+    results = {
+        "config": vars(args),
+        "poolBuildMs": build_seconds * 1000,
+        "vectorized": percentiles(vectorized),
+        "loop": percentiles(loop),
+        "speedup": speedup,
+        # Queries after which building the pool has paid for itself
+        "breakEvenQueries": build_seconds / max((sum(loop) - sum(vectorized)) / len(queries), 1e-9),
+        "mismatches": mismatches,
+        "passed": speedup >= args.min_speedup and mismatches == 0,
+    }
+    write_results(results, args.output)
+
+    if not results["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
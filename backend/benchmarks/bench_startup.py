@@ -0,0 +1,107 @@
+"""Measure API cold-start import time and fail if it exceeds a budget.
+
+Each run imports the API module in a fresh interpreter with -X importtime,
+so module-level work in every imported package is counted. The report lists
+the slowest modules by cumulative import time and any heavy dependency that
+the API pulled in at import even though only a specific code path needs it.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be loaded by the code paths that use them, never by the API at import
+HEAVY_MODULES = ["langchain", "langchain_community", "sentence_transformers", "torch", "transformers", "telegram"]
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Import a module in a fresh interpreter; return wall time and per-module (self, cumulative) us"""
+    start_time = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start_time
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return elapsed, modules
+
+
+def top_modules(modules: Dict[str, Tuple[int, int]], n: int) -> List[Dict[str, float]]:
+    ranked = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:n]
+    return [
+        {"module": name, "selfMs": self_us / 1000, "cumulativeMs": cumulative_us / 1000}
+        for name, (self_us, cumulative_us) in ranked
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main", help="module whose cold start is measured")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="slowest modules to report")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="fail if the median cold start is slower")
+    parser.add_argument("--no-forbidden", action="store_true", help="don't fail on heavy modules being imported")
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    # The first run warms the OS file cache and .pyc files; it isn't counted
+    import_once(args.module)
+    runs = [import_once(args.module) for _ in range(args.runs)]
+    wall_times = [elapsed for elapsed, _ in runs]
+    median_ms = statistics.median(wall_times) * 1000
+    modules = runs[-1][1]
+
+    loaded_heavy = sorted({name.split(".")[0] for name in modules if name.split(".")[0] in HEAVY_MODULES})
+
+    results = {
+        "module": args.module,
+        "runs": args.runs,
+        "wallMs": {
+            "median": median_ms,
+            "min": min(wall_times) * 1000,
+            "max": max(wall_times) * 1000,
+        },
+        "importMs": modules.get(args.module, (0, 0))[1] / 1000,
+        "budgetMs": args.budget_ms,
+        "slowestModules": top_modules(modules, args.top),
+        "heavyModulesLoaded": loaded_heavy,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median cold start {median_ms:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+    if loaded_heavy and not args.no_forbidden:
+        failures.append(f"heavy modules imported at startup: {', '.join(loaded_heavy)}")
+    if failures:
+        print("FAIL: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
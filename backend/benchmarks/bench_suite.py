@@ -0,0 +1,204 @@
+"""Benchmark matching, API endpoints, scheduler runs and preference extraction at several scales.
+
+Uses a local mongod when --mongo-uri is given (a separate database, which
+is dropped and reseeded), otherwise an in-memory mongomock-motor stand-in
+(pip install mongomock-motor). Absolute numbers from the stand-in don't
+reflect MongoDB, but they are stable enough to compare commits.
+
+Run from the backend directory:
+    python benchmarks/bench_suite.py --scales 1000,10000 --output results.json
+    python benchmarks/bench_suite.py --mongo-uri mongodb://localhost:27017 --output results.json
+
+Write results to a file on each commit and diff the JSON to spot regressions.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from common import (
+    EXTRACTION_MESSAGES,
+    FakeTelegramServer,
+    configure_environment,
+    install_stub_llm,
+    open_database,
+    percentiles,
+    random_preferences,
+    run_metadata,
+    seed_database,
+    write_results,
+)
+
+
+async def timed_calls(call: Callable, count: int, concurrency: int) -> Dict[str, Any]:
+    """Run call(i) count times with the given concurrency; latency percentiles and throughput"""
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start_time = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start_time
+    return {**percentiles(latencies), "perSecond": count / elapsed}
+
+
+async def bench_matching(db, args, rng: random.Random) -> Dict[str, Any]:
+    from app.models.user import UserPreferences
+    from app.services.event_service import find_matching_events
+
+    preferences = [UserPreferences(**random_preferences(rng)) for _ in range(args.queries)]
+
+    async def match(i: int):
+        await find_matching_events(db, f"user-{i}", preferences[i], limit=10)
+
+    return {
+        "sequential": await timed_calls(match, args.queries, 1),
+        "concurrent": await timed_calls(match, args.queries, args.concurrency),
+    }
+
+
+async def bench_api(db, args, rng: random.Random) -> Dict[str, Any]:
+    import httpx
+    from common import CITIES, EVENT_TYPES
+    from app.main import app
+
+    # Startup isn't run; hand the routers the benchmark database directly
+    app.mongodb = db
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def get(path: str, params=None):
+            response = await client.get(path, params=params)
+            response.raise_for_status()
+
+        filters = [
+            {"type": rng.choice(EVENT_TYPES), "location": rng.choice(CITIES), "limit": 20}
+            for _ in range(args.requests)
+        ]
+        return {
+            "GET /events": await timed_calls(lambda i: get("/events/", {"limit": 20}), args.requests, args.concurrency),
+            "GET /events?type&location": await timed_calls(
+                lambda i: get("/events/", filters[i]), args.requests, args.concurrency
+            ),
+            "GET /stats": await timed_calls(lambda i: get("/stats/"), args.requests, args.concurrency),
+        }
+
+
+async def bench_scheduler(db, args) -> Dict[str, Any]:
+    import scheduler
+    import delivery_worker
+    from app.services.notification_queue import init_delivery_queue
+    from telegram import Bot
+    from app.services.telegram_request import InstrumentedRequest
+
+    scheduler.db = db
+    await db.notifications.delete_many({})
+    await init_delivery_queue(db)
+
+    start_time = time.perf_counter()
+    await scheduler.check_daily_notifications()
+    scheduler_seconds = time.perf_counter() - start_time
+    queued = await db.notifications.count_documents({"status": "pending"})
+
+    # Drain the queue through the delivery worker against the fake Bot API
+    with FakeTelegramServer(latency_ms=args.telegram_latency_ms) as telegram:
+        request = InstrumentedRequest(connection_pool_size=args.delivery_concurrency)
+        async with Bot(token="123456:benchmark", base_url=telegram.base_url, request=request) as bot:
+            stats = delivery_worker.DeliveryStats()
+            start_time = time.perf_counter()
+            workers = [
+                asyncio.create_task(delivery_worker.delivery_loop(db, bot, f"bench-{i}", stats))
+                for i in range(args.delivery_concurrency)
+            ]
+            while await db.notifications.count_documents({"status": "pending"}):
+                await asyncio.sleep(0.05)
+            delivery_seconds = time.perf_counter() - start_time
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        sent_to_telegram = telegram.state.calls["sendMessage"]
+
+    return {
+        "dailyUsers": await db.users.count_documents({"preferences.frequency": "daily"}),
+        "checkDailyNotificationsSeconds": scheduler_seconds,
+        "notificationsQueued": queued,
+        "deliverySeconds": delivery_seconds,
+        "delivered": stats.sent,
+        "sendMessageCalls": sent_to_telegram,
+        "deliveredPerSecond": stats.sent / delivery_seconds if delivery_seconds else None,
+    }
+
+
+async def bench_extraction(args, rng: random.Random) -> Dict[str, Any]:
+    from app.services.llm_service import extract_preferences, preference_cache
+
+    stub = install_stub_llm(args.llm_latency_ms)
+    messages = [
+        # Every fifth message is new text, the rest repeat common phrasings
+        f"{rng.choice(EXTRACTION_MESSAGES)} #{i}" if i % 5 == 0 else rng.choice(EXTRACTION_MESSAGES)
+        for i in range(args.messages)
+    ]
+
+    async def extract(i: int):
+        await extract_preferences(messages[i])
+
+    results = await timed_calls(extract, args.messages, args.concurrency)
+    return {**results, "llmCalls": stub.calls, "llmLatencyMs": args.llm_latency_ms, "cache": preference_cache.stats()}
+
+
+async def main_async(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"meta": run_metadata(args.mongo_uri), "config": vars(args), "scales": {}}
+    db = open_database(args.mongo_uri, args.database)
+
+    for scale in args.scales:
+        rng = random.Random(args.seed)
+        users = max(scale // args.events_per_user, 1)
+        seed_start = time.perf_counter()
+        seeded = await seed_database(db, scale, users, seed=args.seed)
+        print(f"Seeded {seeded} in {time.perf_counter() - seed_start:.1f}s")
+
+        results["scales"][str(scale)] = {
+            "seeded": seeded,
+            "findMatchingEvents": await bench_matching(db, args, rng),
+            "api": await bench_api(db, args, rng),
+            "scheduler": await bench_scheduler(db, args),
+        }
+
+    results["extractPreferences"] = await bench_extraction(args, random.Random(args.seed))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-uri", default="", help="local mongod; in-memory stand-in if omitted")
+    parser.add_argument("--database", default="event_assistant_bench", help="dropped and reseeded")
+    parser.add_argument("--scales", default="1000,10000", help="comma-separated event counts")
+    parser.add_argument("--events-per-user", type=int, default=10, help="users seeded = events / this")
+    parser.add_argument("--queries", type=int, default=300, help="find_matching_events calls per scale")
+    parser.add_argument("--requests", type=int, default=200, help="requests per API endpoint per scale")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delivery-concurrency", type=int, default=8)
+    parser.add_argument("--telegram-latency-ms", type=float, default=0.0, help="added to every fake Bot API call")
+    parser.add_argument("--messages", type=int, default=300, help="extract_preferences calls")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="stub LLM latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+    args.scales = [int(scale) for scale in args.scales.split(",")]
+
+    # Must happen before any app module is imported
+    configure_environment(args.mongo_uri, args.database)
+    # One INFO line per Bot API call would drown the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    write_results(asyncio.run(main_async(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure webhook-mode update throughput by POSTing recorded Telegram updates.
+
+Start a fake Bot API and the bot in webhook mode first, e.g. from the
+backend directory:
+    python benchmarks/fake_telegram.py --port 8081 &
+    TELEGRAM_BOT_TOKEN=123:fake TELEGRAM_API_BASE_URL=http://127.0.0.1:8081/bot \\
+        BOT_MODE=webhook WEBHOOK_WORKERS=4 WEBHOOK_SECRET=bench python telegram/bot.py &
+    python benchmarks/bench_webhook.py --secret bench --updates 5000 --chats 500
+
+The webhook's /stats endpoint, which the benchmark polls, needs the secret.
+
+Run it again with a different WEBHOOK_WORKERS to compare updates/second.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from updates import FIXTURES_PATH, load_updates, update_stream
+
+
+async def main_async(args) -> dict:
+    templates = load_updates(args.fixtures)
+    updates = list(update_stream(templates, args.chats, args.updates))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        async def stats() -> dict:
+            response = await client.get("/stats", headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        before = sum((await stats())["processed"])
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def post(update):
+            async with semaphore:
+                response = await client.post(args.path, json=update, headers=headers)
+                response.raise_for_status()
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(post(update) for update in updates))
+        accepted_seconds = time.perf_counter() - start_time
+
+        # Wait for the workers to finish processing everything we sent
+        while True:
+            current = await stats()
+            done = sum(current["processed"]) - before
+            if done >= len(updates) or time.perf_counter() - start_time > args.timeout:
+                break
+            await asyncio.sleep(0.05)
+        processed_seconds = time.perf_counter() - start_time
+
+    return {
+        "config": vars(args),
+        "workers": current["workers"],
+        "sent": len(updates),
+        "processed": done,
+        "acceptedPerSecond": len(updates) / accepted_seconds,
+        "processedPerSecond": done / processed_seconds,
+        "perWorker": current["processed"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8443")
+    parser.add_argument("--path", default="/telegram/webhook")
+    parser.add_argument("--secret", default="", help="the bot's WEBHOOK_SECRET")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel POSTs")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Shared setup for the benchmarks: environment, databases, seed data and a fake Bot API server."""
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the backend directory to the Python path
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+CITIES = ["Atlanta", "Atlantic City", "New York", "Chicago", "Austin", "Miami", "Seattle", "Denver"]
+EVENT_TYPES = ["music", "festival", "conference", "workshop", "sports", "art", "food", "theater", "comedy", "casino"]
+TAGS = [
+    "jazz", "rock", "edm", "tech", "ai", "startup", "wine", "beer", "family", "kids",
+    "outdoor", "free", "poker", "running", "dance", "comics", "cosplay", "film", "yoga", "history",
+]
+FREQUENCIES = ["daily", "daily", "hourly", "off"]
+
+
+def configure_environment(mongo_uri: str = "", database: str = "event_assistant_bench", embeddings: bool = False) -> None:
+    """Set the environment the app modules read at import; call before importing them"""
+    if mongo_uri:
+        os.environ["MONGODB_URI"] = mongo_uri
+    os.environ["DATABASE_NAME"] = database
+    os.environ["EMBEDDINGS_ENABLED"] = "true" if embeddings else "false"
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:benchmark")
+    os.environ.setdefault("LLM_WARMUP", "false")
+    # Benchmarks may run several processes; keep them off the metrics side ports
+    for name in ("BOT_METRICS_PORT", "SCHEDULER_METRICS_PORT", "DELIVERY_METRICS_PORT"):
+        os.environ[name] = "0"
+
+
+def open_database(mongo_uri: str, database: str):
+    """A database on a real mongod, or an in-memory mongomock-motor stand-in"""
+    if mongo_uri:
+        from app.services.mongodb import get_database
+        return get_database("event-assistant-bench")
+
+    # pip install mongomock-motor
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()[database]
+
+
+def random_preferences(rng: random.Random) -> Dict[str, Any]:
+    preferences: Dict[str, Any] = {"frequency": rng.choice(FREQUENCIES)}
+    if rng.random() < 0.8:
+        preferences["eventTypes"] = rng.sample(EVENT_TYPES, rng.randint(1, 3))
+    if rng.random() < 0.7:
+        preferences["location"] = rng.choice(CITIES)
+    if rng.random() < 0.4:
+        preferences["budget"] = {"max": float(rng.choice([0, 25, 50, 100, 250]))}
+    if rng.random() < 0.5:
+        preferences["keywords"] = rng.sample(TAGS, rng.randint(1, 2))
+    return preferences
+
+
+async def seed_database(db, events: int, users: int, seed: int = 42, batch_size: int = 1000) -> Dict[str, int]:
+    """Replace the events, users and notifications collections with generated data"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    for name in ("events", "users", "notifications"):
+        await db[name].drop()
+
+    batch = []
+    for i in range(events):
+        event_type = rng.choice(EVENT_TYPES)
+        city = rng.choice(CITIES)
+        tags = rng.sample(TAGS, rng.randint(1, 4))
+        start_date = now + timedelta(days=rng.uniform(-30, 180))
+        batch.append({
+            "title": f"{tags[0].title()} {event_type} in {city} #{i}",
+            "description": f"A {event_type} event in {city} about {', '.join(tags)}.",
+            "type": event_type,
+            "location": city,
+            "venue": f"Venue {rng.randint(1, 200)}",
+            "startDate": start_date,
+            "endDate": start_date + timedelta(hours=rng.choice([2, 4, 8, 48])),
+            "price": 0.0 if "free" in tags else float(rng.choice([10, 25, 40, 75, 120, 300])),
+            "url": f"https://example.com/events/{i}",
+            "tags": tags,
+            "source": "benchmark",
+        })
+        if len(batch) >= batch_size:
+            await db.events.insert_many(batch)
+            batch = []
+    if batch:
+        await db.events.insert_many(batch)
+
+    batch = []
+    for i in range(users):
+        batch.append({
+            "telegramId": 10_000 + i,
+            "username": f"bench_user_{i}",
+            "firstName": "Bench",
+            "preferences": random_preferences(rng),
+            "createdAt": now - timedelta(days=rng.uniform(0, 30)),
+            "lastActive": now - timedelta(days=rng.uniform(0, 14)),
+        })
+        if len(batch) >= batch_size:
+            await db.users.insert_many(batch)
+            batch = []
+    if batch:
+        await db.users.insert_many(batch)
+
+    # The process's event pool would still hold the previous events
+    from app.services.event_service import event_pool
+    event_pool.invalidate()
+
+    return {"events": events, "users": users}
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    if not values:
+        return {"count": 0, "meanMs": None, "p50Ms": None, "p95Ms": None, "p99Ms": None, "maxMs": None}
+
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "meanMs": statistics.fmean(ordered) * 1000,
+        "p50Ms": pct(50),
+        "p95Ms": pct(95),
+        "p99Ms": pct(99),
+        "maxMs": ordered[-1] * 1000,
+    }
+
+
+def run_metadata(mongo_uri: str) -> Dict[str, Any]:
+    """What the results were measured on, so runs from different commits can be compared"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "database": "mongod" if mongo_uri else "mongomock",
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def write_results(results: Dict[str, Any], output: Optional[str]) -> None:
+    text = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeTelegramServer:
+    """Run the fake Bot API (fake_telegram.py) on a background thread"""
+
+    def __init__(self, latency_ms: float = 0.0, rate_limit_every: int = 0):
+        from fake_telegram import FakeBotAPI
+
+        self.state = FakeBotAPI(latency_ms=latency_ms, rate_limit_every=rate_limit_every)
+        self.port = _free_port()
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for python-telegram-bot's base_url"""
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def __enter__(self) -> "FakeTelegramServer":
+        import uvicorn
+        from fake_telegram import create_fake_bot_api
+
+        config = uvicorn.Config(create_fake_bot_api(self.state), host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class StubPrompt:
+    """Stands in for the langchain prompt so benchmarks don't need langchain"""
+
+    class _Rendered:
+        def __init__(self, text: str):
+            self.text = text
+
+        def to_string(self) -> str:
+            return self.text
+
+    def format_prompt(self, input: str) -> "StubPrompt._Rendered":
+        return self._Rendered(f"Extract event preferences as JSON.\n\n{input}")
+
+
+class StubLLM:
+    """Synchronous LLM stand-in with a fixed latency; counts its calls"""
+
+    def __init__(self, latency_ms: float = 200.0):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        return '{"eventTypes": ["music"], "location": "Atlanta", "keywords": ["jazz"]}'
+
+
+def install_stub_llm(latency_ms: float) -> StubLLM:
+    """Point the shared LLM client at a stub model"""
+    from app.services.llm_service import llm_manager
+
+    stub = StubLLM(latency_ms)
+    llm_manager.llm = stub
+    llm_manager.prompt = StubPrompt()
+    llm_manager.started = True
+    return stub
+
+
+# Messages for preference extraction: some the rules fully understand, some they don't
+EXTRACTION_MESSAGES: List[str] = [
+    "jazz concerts in Atlanta",
+    "poker tournaments in Atlantic City under $500",
+    "free workshops this weekend",
+    "tech conferences in Austin between $50 and $200",
+    "something fun to do with my grandmother who likes gardening",
+    "anything with live bands and good food trucks near the water",
+    "I want to see a show that my kids would love",
+    "comedy nights in Chicago",
+    "looking for somewhere to dance late on fridays",
+    "art exhibitions in New York",
+]
@@ -0,0 +1,121 @@
+"""Local fake of the Telegram Bot API that records outgoing calls.
+
+Point python-telegram-bot at it with base_url "http://127.0.0.1:<port>/bot"
+(the bot reads TELEGRAM_API_BASE_URL). Every method returns a plausible
+result, and GET /calls reports how many times each method was called.
+
+Run standalone from the backend directory:
+    python benchmarks/fake_telegram.py --port 8081
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_event_bot"}
+
+# Methods whose result is a Message
+_MESSAGE_METHODS = {"sendMessage", "editMessageText", "sendPhoto", "editMessageReplyMarkup"}
+
+
+class FakeBotAPI:
+    """Recorded state of the fake Bot API"""
+
+    def __init__(self, latency_ms: float = 0.0, rate_limit_every: int = 0):
+        self.latency = latency_ms / 1000
+        self.rate_limit_every = rate_limit_every
+        self.calls: Counter = Counter()
+        self.sent_to: Counter = Counter()
+        self.rate_limited = 0
+        self._message_ids = itertools.count(1)
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.sent_to.clear()
+        self.rate_limited = 0
+
+    def result_for(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return []
+        if method in _MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id") or 0)
+            self.sent_to[chat_id] += 1
+            return {
+                "message_id": int(params.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+def create_fake_bot_api(state: Optional[FakeBotAPI] = None) -> FastAPI:
+    """Create the fake Bot API app around a FakeBotAPI state object"""
+    state = state or FakeBotAPI()
+    app = FastAPI(title="Fake Telegram Bot API")
+    app.state.fake = state
+
+    @app.post("/bot{token}/{method}")
+    async def call_method(token: str, method: str, request: Request):
+        # python-telegram-bot sends urlencoded fields (nested values JSON-encoded); accept JSON too
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            params = await request.json()
+        elif content_type.startswith("multipart/"):
+            params = dict(await request.form())
+        else:
+            params = dict(parse_qsl((await request.body()).decode()))
+
+        state.calls[method] += 1
+        if state.latency:
+            await asyncio.sleep(state.latency)
+
+        if state.rate_limit_every and method == "sendMessage" and state.calls[method] % state.rate_limit_every == 0:
+            state.rate_limited += 1
+            return JSONResponse(status_code=429, content={
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            })
+
+        return {"ok": True, "result": state.result_for(method, params)}
+
+    @app.get("/calls")
+    async def get_calls():
+        return {"calls": dict(state.calls), "chats": len(state.sent_to), "rateLimited": state.rate_limited}
+
+    @app.post("/reset")
+    async def reset_calls():
+        state.reset()
+        return {"ok": True}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every call")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth sendMessage with 429")
+    args = parser.parse_args()
+
+    state = FakeBotAPI(latency_ms=args.latency_ms, rate_limit_every=args.rate_limit_every)
+    uvicorn.run(create_fake_bot_api(state), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Helpers for replaying recorded Telegram updates as many different chats."""
+import copy
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, List, Sequence, Set
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "telegram_updates.json")
+
+
+def load_updates(path: str = FIXTURES_PATH) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def personalize(update: Dict[str, Any], chat_id: int, update_id: int) -> Dict[str, Any]:
+    """Copy a recorded update, rewriting its update id and chat/user ids"""
+    update = copy.deepcopy(update)
+    update["update_id"] = update_id
+
+    for field in ("message", "edited_message"):
+        if field in update:
+            update[field]["chat"]["id"] = chat_id
+            update[field]["from"]["id"] = chat_id
+            update[field]["message_id"] = update_id
+
+    if "callback_query" in update:
+        callback_query = update["callback_query"]
+        callback_query["id"] = str(update_id)
+        callback_query["chat_instance"] = str(chat_id)
+        callback_query["from"]["id"] = chat_id
+        if callback_query.get("message"):
+            callback_query["message"]["chat"]["id"] = chat_id
+
+    return update
+
+
+def update_stream(templates: List[Dict[str, Any]], chats: int, total: int, first_chat_id: int = 10_000) -> Iterator[Dict[str, Any]]:
+    """Yield `total` updates; every chat replays the recorded conversation in order"""
+    for i in range(total):
+        chat_index = i % chats
+        step = (i // chats) % len(templates)
+        yield personalize(templates[step], first_chat_id + chat_index, i + 1)
+
+
+def is_free_text(update: Dict[str, Any]) -> bool:
+    text = update.get("message", {}).get("text", "")
+    return bool(text) and not text.startswith("/")
+
+
+def mix_in_text(updates: List[Dict[str, Any]], messages: Sequence[str], ratio: float, seed: int = 42) -> Set[int]:
+    """Replace a share of the free-text updates with one of messages, made unique per update
+
+    The update id is appended so the text is also new to the preference
+    cache. Returns the ids of the rewritten updates.
+    """
+    rng = random.Random(seed)
+    rewritten = set()
+    for update in updates:
+        if messages and is_free_text(update) and rng.random() < ratio:
+            update["message"]["text"] = f"{rng.choice(messages)} #{update['update_id']}"
+            rewritten.add(update["update_id"])
+    return rewritten
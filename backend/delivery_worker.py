@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, InvalidToken, RetryAfter
+from dotenv import load_dotenv
+
+from app.services.metrics import DELIVERY_METRICS_PORT, serve_metrics
+from app.services.mongodb import close_client, get_database
+from app.services.telegram_request import InstrumentedRequest
+from app.services.notification_queue import (
+    DELIVERY_MAX_ATTEMPTS,
+    backoff_delay,
+    claim_notification,
+    init_delivery_queue,
+    mark_failed,
+    mark_sent,
+    schedule_retry,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Telegram Bot token
+TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+if not TOKEN:
+    logger.error("No Telegram bot token provided!")
+    sys.exit(1)
+
+# Override the Bot API endpoint, e.g. to point at a local fake for benchmarks
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "")
+
+# Worker settings
+DELIVERY_CONCURRENCY = int(os.getenv("DELIVERY_CONCURRENCY", "4"))
+DELIVERY_POLL_SECONDS = float(os.getenv("DELIVERY_POLL_SECONDS", "1"))
+DELIVERY_STATS_SECONDS = float(os.getenv("DELIVERY_STATS_SECONDS", "60"))
+
+
+class DeliveryStats:
+    """Counters for measuring delivery throughput of this process"""
+
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return (
+            f"sent={self.sent} retried={self.retried} failed={self.failed} "
+            f"throughput={self.sent / elapsed:.2f} msg/s"
+        )
+
+
+async def deliver(db, bot: Bot, notification, stats: DeliveryStats) -> None:
+    """Send one leased notification and record the outcome."""
+    attempts = notification.get("attempts", 1)
+
+    try:
+        await bot.send_message(
+            chat_id=notification["chatId"],
+            text=notification["text"],
+            parse_mode="Markdown"
+        )
+    except RetryAfter as e:
+        # Telegram told us exactly how long to wait; this doesn't count as a failure
+        stats.retried += 1
+        await schedule_retry(db, notification, float(e.retry_after), str(e))
+        return
+    except (BadRequest, Forbidden, InvalidToken) as e:
+        # Permanent: the chat is gone, the bot was blocked or the message is invalid
+        stats.failed += 1
+        logger.error(f"Notification {notification['_id']} dead-lettered: {e}")
+        await mark_failed(db, notification, str(e))
+        return
+    except Exception as e:
+        # NetworkError, TimedOut and anything unexpected are retried with backoff
+        if attempts >= DELIVERY_MAX_ATTEMPTS:
+            stats.failed += 1
+            logger.error(f"Notification {notification['_id']} failed after {attempts} attempts: {e}")
+            await mark_failed(db, notification, str(e))
+        else:
+            stats.retried += 1
+            await schedule_retry(db, notification, backoff_delay(attempts), str(e))
+        return
+
+    stats.sent += 1
+    await mark_sent(db, notification)
+
+
+async def delivery_loop(db, bot: Bot, worker_id: str, stats: DeliveryStats) -> None:
+    """Claim and deliver notifications until cancelled."""
+    while True:
+        try:
+            notification = await claim_notification(db, worker_id)
+            if notification is None:
+                await asyncio.sleep(DELIVERY_POLL_SECONDS)
+                continue
+
+            await deliver(db, bot, notification, stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in delivery worker {worker_id}: {e}")
+            await asyncio.sleep(DELIVERY_POLL_SECONDS)
+
+
+async def report_stats(stats: DeliveryStats) -> None:
+    """Periodically log delivery throughput."""
+    while True:
+        await asyncio.sleep(DELIVERY_STATS_SECONDS)
+        logger.info(f"Delivery stats (pid {os.getpid()}): {stats.summary()}")
+
+
+async def run_workers(concurrency: int) -> None:
+    """Run a pool of async delivery workers in this process."""
+    db = get_database("event-assistant-delivery")
+    await init_delivery_queue(db)
+
+    stats = DeliveryStats()
+    process_id = uuid.uuid4().hex[:8]
+
+    # One pooled connection per async worker; the default pool has a single connection
+    request = InstrumentedRequest(connection_pool_size=concurrency)
+
+    bot_options = {"base_url": TELEGRAM_API_BASE_URL} if TELEGRAM_API_BASE_URL else {}
+
+    async with Bot(token=TOKEN, request=request, **bot_options) as bot:
+        tasks = [
+            asyncio.create_task(delivery_loop(db, bot, f"{process_id}-{i}", stats))
+            for i in range(concurrency)
+        ]
+        tasks.append(asyncio.create_task(report_stats(stats)))
+        logger.info(f"Delivery process {process_id} started with {concurrency} workers")
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            logger.info(f"Delivery process {process_id} stopped: {stats.summary()}")
+            close_client()
+
+
+def _run_process(concurrency: int, index: int = 0) -> None:
+    # Each process has its own metrics, on consecutive ports
+    if DELIVERY_METRICS_PORT:
+        serve_metrics(DELIVERY_METRICS_PORT + index)
+    try:
+        asyncio.run(run_workers(concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    """Start one or more delivery worker processes."""
+    parser = argparse.ArgumentParser(description="Deliver queued notifications through Telegram")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument(
+        "--concurrency", type=int, default=DELIVERY_CONCURRENCY,
+        help="async workers per process"
+    )
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _run_process(args.concurrency)
+        return
+
+    # Leases make workers safe to run side by side, so scaling out is just more processes
+    processes = [
+        multiprocessing.Process(target=_run_process, args=(args.concurrency, i))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
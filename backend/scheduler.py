@@ -8,15 +8,18 @@ from typing import List, Dict, Any
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from motor.motor_asyncio import AsyncIOMotorClient
-from telegram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 
 from app.models.user import User, UserPreferences
 from app.models.event import Event
 from app.models.notification import Notification
-from app.services.event_service import find_matching_events
+from app.services.event_service import PreferenceGroupMatcher
+from app.services.job_runs import init_job_runs, job_execution
+from app.services.metrics import SCHEDULER_METRICS_PORT, JobRun, serve_metrics, track_job
+from app.services.mongodb import close_client, get_database
+from app.services.profiling import profile_job
+from app.services.notification_queue import enqueue_notification
 
 # Load environment variables
 load_dotenv()
@@ -28,166 +31,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Telegram Bot token
-TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-if not TOKEN:
-    logger.error("No Telegram bot token provided!")
-    sys.exit(1)
+# MongoDB connection, from the shared pool settings
+db = get_database("event-assistant-scheduler")
 
-# MongoDB connection
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "event_assistant")
+# How late a run may start (e.g. after the previous one overran) before it is skipped
+JOB_MISFIRE_GRACE_SECONDS = int(os.getenv("JOB_MISFIRE_GRACE_SECONDS", "900"))
 
-# Initialize MongoDB client
-mongodb_client = AsyncIOMotorClient(MONGODB_URI)
-db = mongodb_client[DATABASE_NAME]
 
-# Initialize Telegram Bot
-bot = Bot(token=TOKEN)
+async def queue_event_notification(user_doc: Dict[str, Any], event: Event) -> bool:
+    """Queue a notification about an event for the delivery workers."""
+    try:
+        await enqueue_notification(db, str(user_doc["_id"]), user_doc["telegramId"], event)
+        return True
+    except Exception as e:
+        logger.error(f"Error queueing notification: {e}")
+        return False
 
 
-async def send_event_notification(user_id: str, event: Event) -> None:
-    """Send a notification about an event to a user."""
-    try:
-        # Get user from the database
-        db_user = await db.users.find_one({"_id": user_id})
-        
-        if not db_user:
-            logger.error(f"User {user_id} not found")
-            return
-        
-        # Create notification record
-        notification = Notification(
-            userId=user_id,
-            eventId=event.id,
-            sentAt=datetime.utcnow(),
-            status="pending",
-            type="auto"
-        )
-        
-        # Insert notification
-        notification_dict = notification.dict()
-        notification_dict.pop("id")  # Remove id field
-        result = await db.notifications.insert_one(notification_dict)
-        notification_id = result.inserted_id
-        
-        # Format event message
-        event_message = (
-            f"🎉 New Event Alert! 🎉\n\n"
-            f"🎭 *{event.title}*\n"
-            f"📝 {event.description[:100]}...\n"
-            f"📍 {event.location}"
-        )
-        
-        if event.venue:
-            event_message += f" ({event.venue})"
-        
-        event_message += f"\n📅 {event.startDate.strftime('%Y-%m-%d %H:%M')}"
-        
-        if event.price is not None:
-            event_message += f"\n💰 {'Free' if event.price == 0 else f'${event.price:.2f}'}"
-        
-        if event.url:
-            event_message += f"\n🔗 [More Info]({event.url})"
-        
-        # Send message to user
-        await bot.send_message(
-            chat_id=db_user["telegramId"],
-            text=event_message,
-            parse_mode="Markdown"
-        )
+async def notify_user(user_doc: Dict[str, Any], matcher: PreferenceGroupMatcher, run: JobRun) -> None:
+    """Queue notifications for a user's best matching events they haven't been told about."""
+    user_id = str(user_doc["_id"])
+    preferences = UserPreferences(**user_doc.get("preferences", {}))
+    
+    # Find matching events, shared with every user with the same preferences
+    events = await matcher.match(preferences)
+    
+    for event in events:
+        # Check if we've already notified this user about this event
+        notification_exists = await db.notifications.find_one({
+            "userId": user_id,
+            "eventId": event.id
+        })
         
-        # Update notification status to sent
-        await db.notifications.update_one(
-            {"_id": notification_id},
-            {"$set": {"status": "sent"}}
-        )
+        if not notification_exists and await queue_event_notification(user_doc, event):
+            run.notification_queued()
+
+
+async def run_notification_job(job: str, frequency: str, limit: int, resume_within: timedelta) -> None:
+    """Notify every user with the given frequency, holding the job's lock.
     
-    except Exception as e:
-        logger.error(f"Error sending notification: {e}")
-        # Update notification status to failed
-        if notification_id:
-            await db.notifications.update_one(
-                {"_id": notification_id},
-                {"$set": {"status": "failed"}}
-            )
+    A failure for one user is logged and the run moves on to the next. If
+    the run dies part way, the next run within resume_within picks up
+    after the last checkpointed user. Events are matched once per distinct
+    set of preferences rather than once per user.
+    """
+    with track_job(job) as run, profile_job(job):
+        try:
+            async with job_execution(db, job, run, resume_within) as execution:
+                if execution is None:
+                    return
+                
+                matcher = PreferenceGroupMatcher(db, limit)
+                execution.details = matcher.stats
+                async for user_doc in execution.users({"preferences.frequency": frequency}):
+                    run.user_processed()
+                    try:
+                        await notify_user(user_doc, matcher, run)
+                    except Exception as e:
+                        execution.user_failed()
+                        logger.error(f"Error in {job} for user {user_doc['_id']}: {e}")
+        
+        except Exception as e:
+            run.outcome = "error"
+            logger.error(f"Error in {job}: {e}")
 
 
 async def check_hourly_notifications() -> None:
     """Check and send notifications to users with hourly frequency."""
     logger.info("Running hourly notification check")
-    
-    try:
-        # Get users with hourly notification frequency
-        cursor = db.users.find({"preferences.frequency": "hourly"})
-        users = await cursor.to_list(length=None)
-        
-        for user_doc in users:
-            user_id = str(user_doc["_id"])
-            preferences = UserPreferences(**user_doc.get("preferences", {}))
-            
-            # Find matching events
-            events = await find_matching_events(db, user_id, preferences, limit=1)
-            
-            if events:
-                # Check if we've already notified this user about this event
-                notification_exists = await db.notifications.find_one({
-                    "userId": user_id,
-                    "eventId": events[0].id
-                })
-                
-                if not notification_exists:
-                    await send_event_notification(user_id, events[0])
-    
-    except Exception as e:
-        logger.error(f"Error in hourly notification check: {e}")
+    await run_notification_job("hourly_notifications", "hourly", limit=1, resume_within=timedelta(hours=1))
 
 
 async def check_daily_notifications() -> None:
     """Check and send notifications to users with daily frequency."""
     logger.info("Running daily notification check")
-    
-    try:
-        # Get users with daily notification frequency
-        cursor = db.users.find({"preferences.frequency": "daily"})
-        users = await cursor.to_list(length=None)
-        
-        for user_doc in users:
-            user_id = str(user_doc["_id"])
-            preferences = UserPreferences(**user_doc.get("preferences", {}))
-            
-            # Find matching events
-            events = await find_matching_events(db, user_id, preferences, limit=3)
-            
-            for event in events:
-                # Check if we've already notified this user about this event
-                notification_exists = await db.notifications.find_one({
-                    "userId": user_id,
-                    "eventId": event.id
-                })
-                
-                if not notification_exists:
-                    await send_event_notification(user_id, event)
-    
-    except Exception as e:
-        logger.error(f"Error in daily notification check: {e}")
-
-
-async def cleanup_old_notifications() -> None:
-    """Clean up old notifications (older than 30 days)."""
-    logger.info("Running notification cleanup")
-    
-    try:
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        result = await db.notifications.delete_many({
-            "sentAt": {"$lt": thirty_days_ago}
-        })
-        
-        if result.deleted_count > 0:
-            logger.info(f"Deleted {result.deleted_count} old notifications")
-    
-    except Exception as e:
-        logger.error(f"Error in notification cleanup: {e}")
+    await run_notification_job("daily_notifications", "daily", limit=3, resume_within=timedelta(hours=12))
 
 
 async def main() -> None:
@@ -195,10 +113,19 @@ async def main() -> None:
     # Create scheduler
     scheduler = AsyncIOScheduler()
     
-    # Add jobs
-    scheduler.add_job(check_hourly_notifications, 'interval', hours=1)
-    scheduler.add_job(check_daily_notifications, 'cron', hour=9, minute=0)  # 9 AM daily
-    scheduler.add_job(cleanup_old_notifications, 'cron', day=1)  # First day of each month
+    await init_job_runs(db)
+    
+    # Add jobs. A run that is due while the previous one is still going is
+    # skipped (APScheduler logs it) rather than started alongside it, and
+    # runs missed while the scheduler was busy or down collapse into one.
+    # Across scheduler processes, the job lock in job_runs does the same.
+    job_defaults = {"max_instances": 1, "coalesce": True, "misfire_grace_time": JOB_MISFIRE_GRACE_SECONDS}
+    scheduler.add_job(check_hourly_notifications, 'interval', hours=1, **job_defaults)
+    scheduler.add_job(check_daily_notifications, 'cron', hour=9, minute=0, **job_defaults)  # 9 AM daily
+    # Old notifications are expired by the TTL index on sentAt (see app.services.mongodb)
+    
+    # Job durations and counts are served on a side port
+    serve_metrics(SCHEDULER_METRICS_PORT)
     
     # Start scheduler
     scheduler.start()
@@ -211,7 +138,7 @@ async def main() -> None:
     except (KeyboardInterrupt, SystemExit):
         # Shutdown
         scheduler.shutdown()
-        mongodb_client.close()
+        close_client()
         logger.info("Scheduler stopped")
 
 
@@ -3,7 +3,7 @@ import logging
 import os
 import sys
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -17,12 +17,27 @@ from telegram.ext import (
     ContextTypes,
     filters
 )
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 from dotenv import load_dotenv
 
 from app.models.user import User, UserPreferences
 from app.models.event import Event
-from app.services.llm_service import extract_preferences
+from app.services.llm_service import extract_preferences, llm_manager
+from app.services.message_format import escape_markdown, format_event
+from app.services.mongodb import get_database
+from app.services.rule_extractor import rule_extractor
+from app.services.user_session_cache import UserSessionCache
+from app.services.telegram_webhook import run_webhook
+from app.services.update_processor import ChatOrderedUpdateProcessor
+from app.services.message_debouncer import MessageDebouncer
+from app.services.metrics import BOT_METRICS_PORT, serve_metrics
+from app.services.telegram_request import InstrumentedRequest
+from app.services.result_pages import (
+    RESULTS_MAX_EVENTS,
+    RESULTS_PAGE_SIZE,
+    ResultPageCache,
+    page_count,
+)
 from app.services.event_service import find_matching_events, generate_mock_events
 
 # Load environment variables
@@ -41,13 +56,54 @@ if not TOKEN:
     logger.error("No Telegram bot token provided!")
     sys.exit(1)
 
-# MongoDB connection
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "event_assistant")
+# "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Override the Bot API endpoint, e.g. to point at a local fake for load tests
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "")
+
+# Send a warmup request to the LLM when the bot starts
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+
+# MongoDB connection, from the shared pool settings
+db = get_database("event-assistant-bot")
+
+# Recently active users, so chat handlers don't re-read them on every update
+user_sessions = UserSessionCache()
 
-# Initialize MongoDB client
-mongodb_client = AsyncIOMotorClient(MONGODB_URI)
-db = mongodb_client[DATABASE_NAME]
+# Search results kept for paging with inline buttons
+result_pages = ResultPageCache()
+
+# Quick successive messages from a chat are handled as one
+message_debouncer = MessageDebouncer()
+
+
+async def get_user_doc(telegram_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user document from the session cache, falling back to MongoDB."""
+    db_user = user_sessions.get(telegram_id)
+    
+    if db_user is None:
+        db_user = await db.users.find_one({"telegramId": telegram_id})
+        if db_user:
+            user_sessions.put(telegram_id, db_user)
+    
+    return db_user
+
+
+async def update_user_doc(telegram_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update a user in one round trip and write the result through to the cache."""
+    db_user = await db.users.find_one_and_update(
+        {"telegramId": telegram_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if db_user:
+        user_sessions.put(telegram_id, db_user)
+    else:
+        user_sessions.invalidate(telegram_id)
+    
+    return db_user
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -55,7 +111,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
     
     # Create or update user in the database
-    db_user = await db.users.find_one({"telegramId": user.id})
+    db_user = await get_user_doc(user.id)
     
     if not db_user:
         new_user = User(
@@ -68,7 +124,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                 frequency="daily"
             )
         )
-        await db.users.insert_one(new_user.dict(exclude={"id"}))
+        user_doc = new_user.dict(exclude={"id"})
+        await db.users.insert_one(user_doc)
+        user_sessions.put(user.id, user_doc)
     
     welcome_message = (
         f"👋 Welcome to the AI Event Assistant, {user.first_name}!\n\n"
@@ -112,8 +170,8 @@ async def show_preferences(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     """Show the user's current preferences."""
     user = update.effective_user
     
-    # Get user from the database
-    db_user = await db.users.find_one({"telegramId": user.id})
+    # Get user from the session cache or the database
+    db_user = await get_user_doc(user.id)
     
     if not db_user:
         await update.message.reply_text(
@@ -167,12 +225,12 @@ async def update_frequency(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     frequency = query.data.split("_")[1]  # freq_hourly -> hourly
     
     # Update user preferences in the database
-    result = await db.users.update_one(
-        {"telegramId": user.id},
-        {"$set": {"preferences.frequency": frequency, "lastActive": datetime.utcnow()}}
+    db_user = await update_user_doc(
+        user.id,
+        {"preferences.frequency": frequency, "lastActive": datetime.utcnow()}
     )
     
-    if result.modified_count > 0:
+    if db_user:
         await query.edit_message_text(
             f"✅ Your notification frequency has been updated to {frequency}.\n\n"
             "You can view your current preferences with /preferences"
@@ -183,12 +241,72 @@ async def update_frequency(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         )
 
 
+def render_results_page(token: str, results: Dict[str, Any], page: int):
+    """Render one page of stored results as message text and inline keyboard."""
+    events = results["events"]
+    pages = page_count(len(events))
+    page = min(max(page, 0), pages - 1)
+    page_events = events[page * RESULTS_PAGE_SIZE:(page + 1) * RESULTS_PAGE_SIZE]
+    
+    text = results["header"] + "\n\n" + "\n\n".join(format_event(event) for event in page_events)
+    if pages > 1:
+        text += f"\n\nPage {page + 1}/{pages}"
+    
+    # Link buttons for the events on this page, then navigation
+    keyboard = [
+        [InlineKeyboardButton(f"View: {event.title[:40]}", url=event.url)]
+        for event in page_events if event.url
+    ]
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("◀ Prev", callback_data=f"page:{token}:{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton("Next ▶", callback_data=f"page:{token}:{page + 1}"))
+    if navigation:
+        keyboard.append(navigation)
+    
+    return text, InlineKeyboardMarkup(keyboard) if keyboard else None
+
+
+async def send_results(update: Update, header: str, events: List[Event]) -> None:
+    """Send search results as a single message with inline paging."""
+    token = result_pages.store(header, events)
+    text, reply_markup = render_results_page(token, {"header": header, "events": events}, 0)
+    
+    await update.message.reply_text(
+        text,
+        parse_mode="Markdown",
+        reply_markup=reply_markup,
+        disable_web_page_preview=True
+    )
+
+
+async def show_results_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle next/prev buttons by re-rendering the message from cached results."""
+    query = update.callback_query
+    _, token, page = query.data.split(":")  # page:<token>:<n>
+    
+    results = result_pages.get(token)
+    if results is None:
+        await query.answer("These results have expired. Send /events to search again.")
+        return
+    
+    await query.answer()
+    text, reply_markup = render_results_page(token, results, int(page))
+    await query.edit_message_text(
+        text,
+        parse_mode="Markdown",
+        reply_markup=reply_markup,
+        disable_web_page_preview=True
+    )
+
+
 async def get_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Get events matching the user's preferences."""
     user = update.effective_user
     
-    # Get user from the database
-    db_user = await db.users.find_one({"telegramId": user.id})
+    # Get user from the session cache or the database
+    db_user = await get_user_doc(user.id)
     
     if not db_user:
         await update.message.reply_text(
@@ -202,12 +320,12 @@ async def get_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     preferences = UserPreferences(**db_user.get("preferences", {}))
     
     # Find matching events
-    events = await find_matching_events(db, user_id, preferences, limit=5)
+    events = await find_matching_events(db, user_id, preferences, limit=RESULTS_MAX_EVENTS)
     
     if not events:
         # If no events found, generate mock events for demo purposes
         await generate_mock_events(db)
-        events = await find_matching_events(db, user_id, preferences, limit=5)
+        events = await find_matching_events(db, user_id, preferences, limit=RESULTS_MAX_EVENTS)
     
     if not events:
         await update.message.reply_text(
@@ -216,46 +334,18 @@ async def get_events(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
     
-    # Send matching events
-    await update.message.reply_text(f"🎉 Found {len(events)} events matching your preferences:")
-    
-    for event in events:
-        # Format event message
-        event_message = (
-            f"🎭 *{event.title}*\n"
-            f"📝 {event.description[:100]}...\n"
-            f"📍 {event.location}"
-        )
-        
-        if event.venue:
-            event_message += f" ({event.venue})"
-        
-        event_message += f"\n📅 {event.startDate.strftime('%Y-%m-%d %H:%M')}"
-        
-        if event.price is not None:
-            event_message += f"\n💰 {'Free' if event.price == 0 else f'${event.price:.2f}'}"
-        
-        if event.url:
-            event_message += f"\n🔗 [More Info]({event.url})"
-        
-        # Create keyboard with link to event if URL is available
-        if event.url:
-            keyboard = [[InlineKeyboardButton("View Event", url=event.url)]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-        else:
-            reply_markup = None
-        
-        await update.message.reply_text(
-            event_message,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
+    # Send all matching events as one paginated message
+    await send_results(update, f"🎉 Found {len(events)} events matching your preferences:", events)
 
 
 async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Process user messages to extract preferences and find matching events."""
     user = update.effective_user
-    message_text = update.message.text
+    
+    # Messages sent in quick succession arrive here merged into the first one
+    message_text = message_debouncer.take(update.effective_chat.id, update.update_id, update.message.text)
+    if message_text is None:
+        return
     
     # Send typing action
     await context.bot.send_chat_action(
@@ -280,25 +370,31 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     update_data = {f"preferences.{k}": v for k, v in preferences.items()}
     update_data["lastActive"] = datetime.utcnow()
     
-    await db.users.update_one(
-        {"telegramId": user.id},
-        {"$set": update_data}
-    )
+    # The updated user comes back from the same write, no re-read needed
+    db_user = await update_user_doc(user.id, update_data)
+    
+    if not db_user:
+        await update.message.reply_text(
+            "I don't know you yet. Please send /start first, then tell me what you're looking for."
+        )
+        return
     
-    # Get updated user from the database
-    db_user = await db.users.find_one({"telegramId": user.id})
     user_id = str(db_user["_id"])
     
     # Convert preferences to the right format
     user_preferences = UserPreferences(**db_user.get("preferences", {}))
     
-    # Find matching events
-    events = await find_matching_events(db, user_id, user_preferences, limit=3)
+    # Find matching events; the free text is matched semantically when possible
+    events = await find_matching_events(
+        db, user_id, user_preferences, limit=RESULTS_MAX_EVENTS, query_text=message_text
+    )
     
     if not events:
         # If no events found, generate mock events for demo purposes
         await generate_mock_events(db)
-        events = await find_matching_events(db, user_id, user_preferences, limit=3)
+        events = await find_matching_events(
+            db, user_id, user_preferences, limit=RESULTS_MAX_EVENTS, query_text=message_text
+        )
     
     # Acknowledge the preference update
     pref_text = []
@@ -320,48 +416,15 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         pref_text.append(f"keywords: {', '.join(preferences['keywords'])}")
     
     prefs_str = ", ".join(pref_text)
+    acknowledgement = f"✅ I've updated your preferences ({prefs_str})."
     
-    await update.message.reply_text(
-        f"✅ I've updated your preferences ({prefs_str})."
-    )
-    
-    # Send matching events
+    # Send the acknowledgement and matching events as one message
     if events:
-        await update.message.reply_text(f"🎉 Found {len(events)} matching events:")
-        
-        for event in events:
-            # Format event message
-            event_message = (
-                f"🎭 *{event.title}*\n"
-                f"📝 {event.description[:100]}...\n"
-                f"📍 {event.location}"
-            )
-            
-            if event.venue:
-                event_message += f" ({event.venue})"
-            
-            event_message += f"\n📅 {event.startDate.strftime('%Y-%m-%d %H:%M')}"
-            
-            if event.price is not None:
-                event_message += f"\n💰 {'Free' if event.price == 0 else f'${event.price:.2f}'}"
-            
-            if event.url:
-                event_message += f"\n🔗 [More Info]({event.url})"
-            
-            # Create keyboard with link to event if URL is available
-            if event.url:
-                keyboard = [[InlineKeyboardButton("View Event", url=event.url)]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-            else:
-                reply_markup = None
-            
-            await update.message.reply_text(
-                event_message,
-                parse_mode="Markdown",
-                reply_markup=reply_markup
-            )
+        # Results are sent as Markdown; the extracted preferences are user and LLM text
+        await send_results(update, f"{escape_markdown(acknowledgement)}\n\n🎉 Found {len(events)} matching events:", events)
     else:
         await update.message.reply_text(
+            f"{acknowledgement}\n\n"
             "I couldn't find any events matching your preferences. "
             "Try updating your preferences with more general criteria."
         )
@@ -377,10 +440,38 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
 
 
-def main() -> None:
-    """Start the bot."""
-    # Create the Application
-    application = Application.builder().token(TOKEN).build()
+async def post_init(application: Application) -> None:
+    """Create the shared LLM client once before handling updates."""
+    # Teach the rule extractor the types and tags of the current event catalog
+    await rule_extractor.refresh_from_catalog(db)
+    await llm_manager.astart(warmup=LLM_WARMUP)
+    logger.info(f"LLM client ready: {llm_manager.stats()}")
+
+
+def build_application(webhook: bool = False) -> Application:
+    """Create the Application with all handlers registered.
+    
+    In webhook mode the Application has no updater; updates are fed to its
+    update_queue by the webhook server instead.
+    """
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .post_init(post_init)
+        # Records Bot API latency and 429s for /metrics
+        .request(InstrumentedRequest(connection_pool_size=256))
+        # Different chats are handled concurrently, each chat's updates in order
+        .concurrent_updates(ChatOrderedUpdateProcessor(debouncer=message_debouncer))
+    )
+    
+    if TELEGRAM_API_BASE_URL:
+        # Lets a local fake Bot API stand in for Telegram
+        builder = builder.base_url(TELEGRAM_API_BASE_URL)
+    
+    if webhook:
+        builder = builder.updater(None)
+    
+    application = builder.build()
     
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -388,14 +479,27 @@ def main() -> None:
     application.add_handler(CommandHandler("preferences", show_preferences))
     application.add_handler(CommandHandler("events", get_events))
     application.add_handler(CallbackQueryHandler(update_frequency, pattern=r"^freq_"))
+    application.add_handler(CallbackQueryHandler(show_results_page, pattern=r"^page:"))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, process_message))
     
     # Add error handler
     application.add_error_handler(error_handler)
     
+    return application
+
+
+def main() -> None:
+    """Start the bot."""
+    if BOT_MODE == "webhook":
+        # Updates arrive over HTTPS and are spread over worker processes by chat
+        run_webhook(build_application)
+        return
+    
     # Run the bot
+    serve_metrics(BOT_METRICS_PORT)
+    application = build_application()
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
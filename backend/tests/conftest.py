@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend's modules (app.*) the same way the services do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
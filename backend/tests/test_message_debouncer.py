@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from app.services.message_debouncer import MessageDebouncer
+
+
+def test_burst_is_merged_into_first_message():
+    debouncer = MessageDebouncer(window_ms=20, max_wait_ms=1000)
+    debouncer.add(1, 10, "jazz")
+    debouncer.add(1, 11, "in Berlin")
+    debouncer.add(1, 12, "under 50 euros")
+
+    asyncio.run(debouncer.wait_quiet(1, 10))
+
+    assert debouncer.take(1, 10, "jazz") == "jazz\nin Berlin\nunder 50 euros"
+    assert debouncer.take(1, 11, "in Berlin") is None
+    assert debouncer.take(1, 12, "under 50 euros") is None
+    assert debouncer.stats() == {"messages": 3, "cycles": 1, "openBursts": 0}
+
+
+def test_chats_are_debounced_separately():
+    debouncer = MessageDebouncer(window_ms=20, max_wait_ms=1000)
+    debouncer.add(1, 10, "jazz")
+    debouncer.add(2, 11, "theatre")
+
+    assert debouncer.take(1, 10, "jazz") == "jazz"
+    assert debouncer.take(2, 11, "theatre") == "theatre"
+
+
+def test_close_starts_a_new_burst():
+    debouncer = MessageDebouncer(window_ms=20, max_wait_ms=1000)
+    debouncer.add(1, 10, "jazz")
+    debouncer.close(1)
+    debouncer.add(1, 12, "theatre")
+
+    assert debouncer.take(1, 10, "jazz") == "jazz"
+    assert debouncer.take(1, 12, "theatre") == "theatre"
+
+
+def test_wait_quiet_returns_once_closed():
+    debouncer = MessageDebouncer(window_ms=10_000, max_wait_ms=10_000)
+    debouncer.add(1, 10, "jazz")
+    debouncer.close(1)
+
+    start_time = time.monotonic()
+    asyncio.run(debouncer.wait_quiet(1, 10))
+    assert time.monotonic() - start_time < 0.1
+
+
+def test_wait_quiet_is_capped_by_max_wait():
+    debouncer = MessageDebouncer(window_ms=200, max_wait_ms=100)
+
+    async def keep_typing():
+        for i in range(1, 10):
+            await asyncio.sleep(0.02)
+            debouncer.add(1, 10 + i, f"message {i}")
+
+    async def run():
+        debouncer.add(1, 10, "message 0")
+        typing = asyncio.create_task(keep_typing())
+        start_time = time.monotonic()
+        await debouncer.wait_quiet(1, 10)
+        waited = time.monotonic() - start_time
+        await typing
+        return waited
+
+    assert 0.09 <= asyncio.run(run()) < 0.18
+
+
+def test_forgotten_message_text_stays_in_burst():
+    debouncer = MessageDebouncer(window_ms=20, max_wait_ms=1000)
+    debouncer.add(1, 10, "jazz")
+    debouncer.add(1, 11, "in Berlin")
+    debouncer.forget(1, 10)
+
+    assert debouncer.take(1, 11, "in Berlin") == "jazz\nin Berlin"
+
+
+def test_disabled_debouncer_passes_text_through():
+    debouncer = MessageDebouncer(window_ms=0)
+    debouncer.add(1, 10, "jazz")
+    debouncer.add(1, 11, "in Berlin")
+
+    assert debouncer.take(1, 10, "jazz") == "jazz"
+    assert debouncer.take(1, 11, "in Berlin") == "in Berlin"
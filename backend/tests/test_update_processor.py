@@ -0,0 +1,207 @@
+import asyncio
+from typing import List
+
+from telegram import Update
+
+from app.services.message_debouncer import MessageDebouncer
+from app.services.update_processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }, None)
+
+
+def make_processor(**kwargs) -> ChatOrderedUpdateProcessor:
+    return ChatOrderedUpdateProcessor(stats_interval=0, **kwargs)
+
+
+class Recorder:
+    """Handler stand-in recording when each update starts and finishes"""
+
+    def __init__(self):
+        self.events: List[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(self, update: Update, delay: float = 0.02, release: asyncio.Event = None) -> None:
+        self.events.append(f"start {update.update_id}")
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        if release is not None:
+            await release.wait()
+        await asyncio.sleep(delay)
+        self.running -= 1
+        self.events.append(f"end {update.update_id}")
+
+    def started(self) -> List[int]:
+        return [int(event.split()[1]) for event in self.events if event.startswith("start")]
+
+
+def test_updates_from_one_chat_run_in_order():
+    processor = make_processor(max_concurrent_updates=8)
+    recorder = Recorder()
+
+    async def run():
+        updates = [make_update(i, 1, "/events" if i % 2 else f"text {i}") for i in range(1, 6)]
+        await asyncio.gather(*(
+            processor.process_update(update, recorder.handle(update, delay=0.01 * (6 - update.update_id)))
+            for update in updates
+        ))
+
+    asyncio.run(run())
+
+    assert recorder.events == [event for i in range(1, 6) for event in (f"start {i}", f"end {i}")]
+    assert processor.processed == 5
+
+
+def test_chats_run_concurrently_up_to_the_limit():
+    processor = make_processor(max_concurrent_updates=2)
+    recorder = Recorder()
+
+    async def run():
+        updates = [make_update(i, i, "/events") for i in range(1, 7)]
+        await asyncio.gather(*(processor.process_update(update, recorder.handle(update)) for update in updates))
+
+    asyncio.run(run())
+
+    assert recorder.max_running == 2
+    assert processor.processed == 6
+    assert processor.stats()["activeChats"] == 0
+
+
+def test_waiting_chat_does_not_hold_a_slot():
+    processor = make_processor(max_concurrent_updates=1)
+    recorder = Recorder()
+
+    async def run():
+        release = asyncio.Event()
+        slow = make_update(1, 1, "/events")
+        queued = make_update(2, 1, "/preferences")
+        other = make_update(3, 2, "/events")
+        tasks = [
+            asyncio.create_task(processor.process_update(slow, recorder.handle(slow, release=release))),
+            asyncio.create_task(processor.process_update(queued, recorder.handle(queued))),
+        ]
+        await asyncio.sleep(0.01)
+        # Chat 1's second update waits on its chat, not on the only slot
+        tasks.append(asyncio.create_task(processor.process_update(other, recorder.handle(other))))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert recorder.started() == [1, 3, 2]
+
+
+def test_superseded_text_is_coalesced_under_load():
+    processor = make_processor(max_concurrent_updates=4, coalesce_depth=0)
+    recorder = Recorder()
+
+    async def run():
+        release = asyncio.Event()
+        command = make_update(1, 1, "/events")
+        texts = [make_update(i, 1, f"text {i}") for i in range(2, 5)]
+        tasks = [asyncio.create_task(processor.process_update(command, recorder.handle(command, release=release)))]
+        tasks += [asyncio.create_task(processor.process_update(text, recorder.handle(text))) for text in texts]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert recorder.started() == [1, 4]
+    assert processor.coalesced == 2
+    assert processor.processed == 2
+
+
+def test_text_is_not_coalesced_across_a_command():
+    processor = make_processor(max_concurrent_updates=4, coalesce_depth=0)
+    recorder = Recorder()
+
+    async def run():
+        release = asyncio.Event()
+        first = make_update(1, 1, "/events")
+        rest = [make_update(2, 1, "text 2"), make_update(3, 1, "/preferences"), make_update(4, 1, "text 4")]
+        tasks = [asyncio.create_task(processor.process_update(first, recorder.handle(first, release=release)))]
+        tasks += [asyncio.create_task(processor.process_update(update, recorder.handle(update))) for update in rest]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert recorder.started() == [1, 2, 3, 4]
+    assert processor.coalesced == 0
+
+
+def test_text_is_kept_below_the_coalesce_depth():
+    processor = make_processor(max_concurrent_updates=4, coalesce_depth=10)
+    recorder = Recorder()
+
+    async def run():
+        updates = [make_update(i, 1, f"text {i}") for i in range(1, 5)]
+        await asyncio.gather(*(processor.process_update(update, recorder.handle(update)) for update in updates))
+
+    asyncio.run(run())
+
+    assert recorder.started() == [1, 2, 3, 4]
+    assert processor.coalesced == 0
+
+
+def test_text_is_shed_when_too_many_are_pending():
+    processor = make_processor(max_concurrent_updates=4, max_pending=1)
+    recorder = Recorder()
+
+    async def run():
+        release = asyncio.Event()
+        first = make_update(1, 1, "/events")
+        text = make_update(2, 2, "jazz in Berlin")
+        command = make_update(3, 2, "/preferences")
+        tasks = [asyncio.create_task(processor.process_update(first, recorder.handle(first, release=release)))]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(processor.process_update(text, recorder.handle(text))))
+        tasks.append(asyncio.create_task(processor.process_update(command, recorder.handle(command))))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    # Commands are processed even over the limit
+    assert recorder.started() == [1, 3]
+    assert processor.shed == 1
+    assert processor.pending == 0
+
+
+def test_debounced_burst_is_handled_once():
+    debouncer = MessageDebouncer(window_ms=30, max_wait_ms=1000)
+    processor = make_processor(max_concurrent_updates=4, debouncer=debouncer)
+    handled: List[str] = []
+
+    async def handle(update: Update) -> None:
+        text = debouncer.take(update.effective_chat.id, update.update_id, update.message.text)
+        if text is not None:
+            handled.append(text)
+
+    async def run():
+        updates = [make_update(1, 1, "jazz"), make_update(2, 1, "in Berlin"), make_update(3, 2, "theatre")]
+        tasks = []
+        for update in updates:
+            tasks.append(asyncio.create_task(processor.process_update(update, handle(update))))
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert sorted(handled) == ["jazz\nin Berlin", "theatre"]
+    assert debouncer.stats()["cycles"] == 2
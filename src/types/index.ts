@@ -7,6 +7,14 @@ export interface User {
   createdAt: string;
   preferences: UserPreferences;
   lastActive: string;
+  notificationStats: NotificationStats;
+}
+
+export interface NotificationStats {
+  total: number;
+  pending: number;
+  failed: number;
+  lastSentAt?: string;
 }
 
 export interface UserPreferences {